@@ -0,0 +1,127 @@
+# analysis_executor.py - Runs blocking analysis work off the asyncio event loop
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import in_current_context
+
+# How many analyses of each kind may run at once. URL analyses mostly wait on the
+# network, images hold a tesseract subprocess, text analyses hold the batchers,
+# claim analyses wait on their own stage threads (news search, fact checks).
+DEFAULT_STAGE_LIMITS = {
+    'text': 8,
+    'url': 6,
+    'image': 2,
+    'claim': 4,
+}
+
+# Requests allowed to wait for a free slot (per stage) before we start shedding load
+DEFAULT_MAX_QUEUE_DEPTH = 32
+
+# Seconds a queued request may wait for a slot before it is shed as well
+DEFAULT_QUEUE_TIMEOUT = 30
+
+
+class ExecutorSaturated(Exception):
+    """Raised when a stage is full and the request should be rejected with 503"""
+
+    def __init__(self, stage, reason):
+        super().__init__(f"Analysis capacity exceeded for '{stage}' requests ({reason}), please retry shortly")
+        self.stage = stage
+        self.reason = reason
+
+
+class AnalysisExecutor:
+    """Bounded thread pool with per-stage concurrency limits and queue-depth backpressure"""
+
+    def __init__(self, stage_limits=None, max_queue_depth=DEFAULT_MAX_QUEUE_DEPTH,
+                 queue_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.stage_limits = dict(DEFAULT_STAGE_LIMITS)
+        self.stage_limits.update(stage_limits or {})
+        self.max_queue_depth = max_queue_depth
+        self.queue_timeout = queue_timeout
+
+        # One worker per admissible slot, so an admitted job never waits for a thread
+        self.pool = ThreadPoolExecutor(max_workers=sum(self.stage_limits.values()),
+                                       thread_name_prefix="analysis")
+
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._waiting = {stage: 0 for stage in self.stage_limits}
+        self._running = {stage: 0 for stage in self.stage_limits}
+        self._rejected = {stage: 0 for stage in self.stage_limits}
+        self._completed = {stage: 0 for stage in self.stage_limits}
+
+    async def run(self, stage, fn, *args):
+        """Run fn(*args) in the pool once a slot for this stage is free"""
+        if stage not in self.stage_limits:
+            raise ValueError(f"Unknown analysis stage: {stage}")
+
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            semaphore = self._semaphores.setdefault(stage, asyncio.Semaphore(self.stage_limits[stage]))
+
+        if not semaphore.locked():
+            # Free slot: nothing between the check and the acquire can yield to the loop
+            await semaphore.acquire()
+        else:
+            with self._lock:
+                if self._waiting[stage] >= self.max_queue_depth:
+                    self._rejected[stage] += 1
+                    raise ExecutorSaturated(stage, "queue full")
+                self._waiting[stage] += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                with self._lock:
+                    self._rejected[stage] += 1
+                raise ExecutorSaturated(stage, "timed out waiting for a slot")
+            finally:
+                with self._lock:
+                    self._waiting[stage] -= 1
+
+        with self._lock:
+            self._running[stage] += 1
+        loop = asyncio.get_running_loop()
+        try:
+            # The request's context (its timings) follows the work onto the pool thread
+            future = self.pool.submit(in_current_context(fn), *args)
+        except BaseException:
+            self._release(stage, semaphore)
+            raise
+        # The slot is held until the thread is done, not until this coroutine stops
+        # waiting: a cancelled request must not let another one start beside the work
+        # it left running
+        future.add_done_callback(lambda _: self._finished(loop, stage, semaphore))
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, loop, stage, semaphore):
+        # Runs on the pool thread (or wherever the future was cancelled)
+        try:
+            loop.call_soon_threadsafe(self._release, stage, semaphore)
+        except RuntimeError:
+            pass    # the loop is closed, and its semaphores with it
+
+    def _release(self, stage, semaphore):
+        semaphore.release()
+        with self._lock:
+            self._running[stage] -= 1
+            self._completed[stage] += 1
+
+    def get_stats(self):
+        """Per-stage snapshot for the health endpoint"""
+        with self._lock:
+            return {
+                stage: {
+                    'limit': self.stage_limits[stage],
+                    'running': self._running[stage],
+                    'queued': self._waiting[stage],
+                    'completed': self._completed[stage],
+                    'rejected': self._rejected[stage],
+                }
+                for stage in self.stage_limits
+            }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,226 @@
+# article_fetcher.py - Connection-pooled async HTTP client for article downloads
+
+import asyncio
+import math
+import threading
+from collections import Counter
+from urllib.parse import urlsplit
+
+import httpx
+
+from single_flight import SingleFlight
+from url_canonical import canonical_url
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+CONNECT_TIMEOUT = 5          # seconds to establish TCP + TLS
+READ_TIMEOUT = 10            # seconds of silence allowed between received chunks
+TOTAL_TIMEOUT = 20           # hard ceiling for one fetch, however slowly bytes trickle in
+MAX_CONNECTIONS = 100
+MAX_CONNECTIONS_PER_HOST = 6
+MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024
+
+
+class FetchError(Exception):
+    """Raised for HTTP error statuses so callers can report them like network errors"""
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401  (httpx only negotiates HTTP/2 when h2 is installed)
+        return True
+    except ImportError:
+        return False
+
+
+class ArticleFetcher:
+    """Shared keep-alive client running on its own event loop thread.
+
+    Synchronous callers (the analyzer running in executor threads) use fetch(), async
+    callers use fetch_async(); both share one connection pool, so repeat visits to a
+    host skip DNS, TCP and TLS setup. Concurrent plain fetches of the same canonical
+    URL share one download.
+    """
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 total_timeout=TOTAL_TIMEOUT, max_connections=MAX_CONNECTIONS,
+                 max_connections_per_host=MAX_CONNECTIONS_PER_HOST, max_bytes=MAX_DOWNLOAD_BYTES):
+        self.timeout = httpx.Timeout(connect=connect_timeout, read=read_timeout,
+                                     write=read_timeout, pool=connect_timeout)
+        self.total_timeout = total_timeout
+        # Longest a blocking caller waits for one fetch: the download's own ceiling plus a pool wait
+        self.result_timeout = total_timeout + connect_timeout
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_connections)
+        self.max_connections_per_host = max_connections_per_host
+        self.max_bytes = max_bytes
+        self.http2 = _http2_available()
+
+        self._host_slots = {}    # host -> [semaphore, fetches using it]; dropped when the last one finishes
+        self._downloads = SingleFlight()    # keyed by (canonical URL, byte cap); only used on the loop
+        self.stats = {'downloads': 0}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="article-fetcher", daemon=True)
+        self._thread.start()
+        self._client = self._submit(self._create_client()).result()
+
+    async def _create_client(self):
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=self.limits,
+            timeout=self.timeout,
+            headers=DEFAULT_HEADERS,
+            follow_redirects=True,
+        )
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def _wait(self, future, timeout):
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()    # also cancels the coroutine on the fetcher's loop
+            raise
+
+    def fetch(self, url, headers=None, max_bytes=None):
+        """Blocking fetch for worker threads; see _fetch for the result shape"""
+        return self._wait(self._submit(self._fetch(url, headers, max_bytes)), self.result_timeout)
+
+    async def fetch_async(self, url, headers=None, max_bytes=None):
+        """Awaitable from any event loop; the download itself runs on the fetcher's loop"""
+        return await asyncio.wrap_future(self._submit(self._fetch(url, headers, max_bytes)))
+
+    def fetch_many(self, urls, headers=None, max_bytes=None):
+        """Fetch several URLs concurrently; returns results or exceptions in input order.
+
+        headers is either one dict shared by every request or a list with one dict per URL.
+        """
+        per_url = headers if isinstance(headers, list) else [headers] * len(urls)
+
+        async def gather():
+            return await asyncio.gather(*(self._fetch(url, h, max_bytes) for url, h in zip(urls, per_url)),
+                                        return_exceptions=True)
+        # The busiest host's fetches run in waves of max_connections_per_host
+        busiest = max(Counter(urlsplit(url).hostname or '' for url in urls).values(), default=0)
+        waves = max(1, math.ceil(busiest / self.max_connections_per_host))
+        return self._wait(self._submit(gather()), self.result_timeout * waves)
+
+    async def _fetch(self, url, headers, max_bytes):
+        """Stream a URL, stopping at max_bytes.
+
+        Returns {'url', 'status_code', 'headers', 'content', 'truncated', 'http_version'};
+        raises FetchError for 4xx/5xx and httpx/asyncio errors for network failures.
+        Callers coalesced onto one download get the same result dict, so treat it as read-only.
+        """
+        max_bytes = max_bytes or self.max_bytes
+        if headers:
+            # Per-request headers (conditional feed refreshes) can change the answer
+            return await self._fetch_once(url, headers, max_bytes)
+
+        # Concurrent fetches of the same article share one download
+        return await self._downloads.do((canonical_url(url), max_bytes), self._fetch_once, url, None, max_bytes)
+
+    async def _fetch_once(self, url, headers, max_bytes):
+        self.stats['downloads'] += 1
+        host = urlsplit(url).hostname or ''
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = [asyncio.Semaphore(self.max_connections_per_host), 0]
+        slots[1] += 1
+        try:
+            async with slots[0]:
+                return await asyncio.wait_for(self._download(url, headers, max_bytes), timeout=self.total_timeout)
+        finally:
+            # Only hosts with fetches in progress keep a semaphore, however many hosts are visited
+            slots[1] -= 1
+            if not slots[1]:
+                del self._host_slots[host]
+
+    async def _download(self, url, headers, max_bytes):
+        async with self._client.stream('GET', url, headers=headers) as response:
+            if response.status_code >= 400:
+                raise FetchError(f"HTTP {response.status_code} for url: {response.url}")
+
+            content = bytearray()
+            truncated = False
+            async for chunk in response.aiter_bytes():
+                content.extend(chunk)
+                if len(content) >= max_bytes:
+                    # Closing the stream here drops the rest of the body without reading it
+                    del content[max_bytes:]
+                    truncated = True
+                    break
+
+            return {
+                'url': str(response.url),
+                'status_code': response.status_code,
+                'headers': dict(response.headers),
+                'content': bytes(content),
+                'truncated': truncated,
+                'http_version': response.http_version,
+            }
+
+    def get_stats(self):
+        return dict(self.stats, active_hosts=len(self._host_slots), coalesced=self._downloads.stats['coalesced'], in_flight=len(self._downloads))
+
+    def close(self):
+        self._submit(self._client.aclose()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+# Exercise the fetcher against a local stub server
+if __name__ == "__main__":
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+        connections = set()
+
+        def do_GET(self):
+            StubHandler.connections.add(self.client_address)
+            if self.path == '/missing':
+                body, status = b'not found', 404
+            elif self.path == '/huge':
+                body, status = b'<p>' + b'x' * (5 * 1024 * 1024) + b'</p>', 200
+            else:
+                body, status = b'<html><title>Stub</title><article>Hello from the stub</article></html>', 200
+            self.send_response(status)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the fetcher hangs up once it reaches its byte cap
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print("🚀 Testing ArticleFetcher against a local stub server")
+    print("="*60)
+
+    fetcher = ArticleFetcher()
+    start = time.perf_counter()
+    for i in range(20):
+        result = fetcher.fetch(f"{base}/article/{i}")
+    print(f"\n📰 20 sequential fetches in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"over {len(StubHandler.connections)} connection(s)")
+
+    results = fetcher.fetch_many([f"{base}/a", f"{base}/missing", f"{base}/huge"])
+    print(f"   /a       -> {results[0]['status_code']} ({len(results[0]['content'])} bytes)")
+    print(f"   /missing -> {type(results[1]).__name__}: {results[1]}")
+    print(f"   /huge    -> {len(results[2]['content'])} bytes, truncated={results[2]['truncated']}")
+
+    fetcher.close()
+    server.shutdown()
+    print("\n🎉 Fetcher test complete!")
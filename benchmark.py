@@ -0,0 +1,329 @@
+# benchmark.py - Offline benchmark of every analysis path, with regression checks against a baseline
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_fixtures')
+DEFAULT_BASELINE = os.path.join(FIXTURES_DIR, 'baseline.json')
+
+SCENARIOS = ('text', 'url', 'image', 'claim')
+DEFAULT_ROUNDS = {'text': 5, 'url': 5, 'image': 2, 'claim': 3}
+
+# A run fails when it is this much worse than the baseline
+LATENCY_TOLERANCE = 0.20        # p50/p95 may grow by 20%
+THROUGHPUT_TOLERANCE = 0.20     # calls per second may drop by 20%
+MEMORY_TOLERANCE = 0.25         # peak RSS may grow by 25%
+
+# External APIs are answered by the stub server from these fixtures
+NEWSAPI_HOST = 'newsapi.org'
+FACTCHECK_HOST = 'factchecktools.googleapis.com'
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """Serves benchmark_fixtures/ plus canned NewsAPI and Fact Check responses"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, directory=FIXTURES_DIR, **kwargs)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        canned = {'/newsapi/v2/everything': 'newsapi.json',
+                  '/factcheck/v1alpha1/claims:search': 'factcheck.json'}.get(path)
+        if canned is None:
+            return super().do_GET()
+        with open(os.path.join(FIXTURES_DIR, canned), 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server():
+    """Serve the fixtures on a free localhost port; returns (server, base URL)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FixtureHandler)
+    threading.Thread(target=server.serve_forever, name="benchmark-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def route_external_apis(base_url):
+    """Send the database's NewsAPI and Google Fact Check calls to the stub server"""
+    import enhanced_database
+
+    real_get = enhanced_database.requests.get
+    rewrites = {NEWSAPI_HOST: f"{base_url}/newsapi", FACTCHECK_HOST: f"{base_url}/factcheck"}
+
+    def local_get(url, *args, **kwargs):
+        parts = urlsplit(url)
+        if parts.hostname in rewrites:
+            url = rewrites[parts.hostname] + parts.path
+        return real_get(url, *args, **kwargs)
+
+    enhanced_database.requests.get = local_get
+
+
+def use_local_feeds(analyzer, base_url):
+    """Swap the live RSS feeds for the fixture feeds and index them once.
+
+    The analyzer must be built with start_feeds=False, so no live feed is ever fetched.
+    """
+    from feed_ingestion import FeedIngestor
+
+    feeds = {os.path.splitext(name)[0]: f"{base_url}/feeds/{name}"
+             for name in sorted(os.listdir(os.path.join(FIXTURES_DIR, 'feeds')))}
+    analyzer.news_feeds = feeds
+    analyzer.feed_ingestor = FeedIngestor(feeds, analyzer.article_fetcher)
+    analyzer.feed_ingestor.add_listener(analyzer._index_feed_entries)
+    analyzer.feed_ingestor.refresh()
+
+
+def render_screenshots(texts, sizes=((1280, 720), (1170, 2532), (1920, 1080))):
+    """Deterministic screenshot-like PNGs of the corpus texts (same input every run)"""
+    import textwrap
+    from PIL import Image, ImageDraw
+
+    images = []
+    for i, text in enumerate(texts):
+        width, height = sizes[i % len(sizes)]
+        image = Image.new('RGB', (width, height), (250, 250, 248))
+        draw = ImageDraw.Draw(image)
+        draw.rectangle([0, 0, width, 60], fill=(29, 161, 242))
+        y = 90
+        for line in textwrap.wrap(text, width=max(20, width // 9)):
+            if y > height - 40:
+                break
+            draw.text((30, y), line, fill=(15, 20, 25))
+            y += 22
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        images.append(buffer.getvalue())
+    return images
+
+
+def rss_mb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def peak_rss_mb():
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is bytes on macOS, KiB elsewhere
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def workers_rss_mb():
+    """Current RSS of this process's live children (the OCR worker processes)"""
+    total = 0
+    parent = str(os.getpid())
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{pid}/stat') as stat:
+                # Fields after the parenthesised command name: state, ppid, ...
+                if stat.read().rsplit(')', 1)[1].split()[1] != parent:
+                    continue
+            with open(f'/proc/{pid}/statm') as statm:
+                total += int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, IndexError):
+            continue
+    return total / 2**20
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(fraction * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_scenario(fn, inputs, rounds, concurrency):
+    """Call fn on every input, rounds times, from concurrency threads; returns the measurements"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(value):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            result = fn(value)
+            failed = isinstance(result, dict) and 'error' in result
+        except Exception:
+            failed = True
+        elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+            errors += failed
+
+    # One untimed pass, so lazy initialisation and first-request caches aren't measured
+    for value in inputs[:2]:
+        fn(value)
+
+    workload = [value for _ in range(rounds) for value in inputs]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, workload))
+    wall_seconds = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'calls': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'mean_ms': round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        'throughput_per_second': round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        'rss_mb': round(rss_mb(), 1),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'workers_rss_mb': round(workers_rss_mb(), 1),
+    }
+
+
+def compare_with_baseline(report, baseline):
+    """Regression messages for every scenario that got worse than the tolerances allow"""
+    regressions = []
+    for name, current in report['scenarios'].items():
+        reference = baseline.get('scenarios', {}).get(name)
+        if not reference:
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            limit = reference[metric] * (1 + LATENCY_TOLERANCE)
+            if reference[metric] and current[metric] > limit:
+                regressions.append(f"{name}: {metric} {current[metric]} > {limit:.2f} (baseline {reference[metric]})")
+        limit = reference['throughput_per_second'] * (1 - THROUGHPUT_TOLERANCE)
+        if current['throughput_per_second'] < limit:
+            regressions.append(f"{name}: throughput {current['throughput_per_second']}/s < {limit:.2f}/s "
+                               f"(baseline {reference['throughput_per_second']}/s)")
+        limit = reference['peak_rss_mb'] * (1 + MEMORY_TOLERANCE)
+        if current['peak_rss_mb'] > limit:
+            regressions.append(f"{name}: peak RSS {current['peak_rss_mb']} MB > {limit:.1f} MB "
+                               f"(baseline {reference['peak_rss_mb']} MB)")
+        if current['errors'] > reference.get('errors', 0):
+            regressions.append(f"{name}: {current['errors']} failed calls (baseline {reference.get('errors', 0)})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark text, URL, image and claim analysis on local fixtures")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument('--rounds', type=int, help="passes over each scenario's inputs (default per scenario)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="baseline JSON to compare against (the run fails if the file doesn't exist)")
+    parser.add_argument('--save-baseline', action='store_true', help="write this run as the new baseline")
+    parser.add_argument('--output', help="also write the report JSON here")
+    parser.add_argument('--verbose', action='store_true', help="show the analyzer's own progress output")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    print("🚀 Offline analysis benchmark")
+    print("="*60)
+
+    server, base_url = start_stub_server()
+    route_external_apis(base_url)
+    print(f"🌐 Fixtures served at {base_url}")
+
+    # The analyzer prints a startup banner and logs per call; both would bury the table
+    def quiet():
+        return contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+
+    base_rss = rss_mb()
+    from enhanced_ai import SuperPoweredNewsVerificationAI, MODEL_WAIT_SECONDS
+    from structured_logging import setup_logging
+    setup_logging(level='INFO' if args.verbose else 'ERROR', fmt='text')
+
+    started = time.perf_counter()
+    with quiet():
+        analyzer = SuperPoweredNewsVerificationAI(start_feeds=False)
+        needed = ['fake_news', 'sentiment'] + (['ocr'] if 'image' in scenarios else [])
+        analyzer.models.wait_ready(needed, timeout=MODEL_WAIT_SECONDS * 10)
+        startup_seconds = time.perf_counter() - started
+        use_local_feeds(analyzer, base_url)
+    print(f"✅ Models ready in {startup_seconds:.1f}s, {rss_mb() - base_rss:.0f} MB")
+
+    with open(os.path.join(FIXTURES_DIR, 'corpus.json')) as f:
+        corpus = json.load(f)
+    pages = sorted(os.listdir(os.path.join(FIXTURES_DIR, 'pages')))
+    workloads = {
+        'text': (analyzer.analyze_text_comprehensive, corpus['texts']),
+        'url': (analyzer.analyze_url_complete, [f"{base_url}/pages/{page}" for page in pages]),
+        'image': (analyzer.analyze_image_complete, render_screenshots(corpus['texts'][:6])),
+        'claim': (analyzer.analyze_claim_comprehensive, corpus['claims']),
+    }
+
+    report = {
+        'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'cpus': os.cpu_count()},
+        'inference_backend': analyzer.inference_backend,
+        'concurrency': args.concurrency,
+        'startup_seconds': round(startup_seconds, 2),
+        'scenarios': {},
+    }
+
+    print(f"\n{'scenario':<8} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'calls/s':>8} "
+          f"{'peak MB':>8} {'errors':>6}")
+    for name in scenarios:
+        fn, inputs = workloads[name]
+        rounds = args.rounds or DEFAULT_ROUNDS[name]
+        with quiet():
+            result = report['scenarios'][name] = run_scenario(fn, inputs, rounds, args.concurrency)
+        print(f"{name:<8} {result['calls']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+              f"{result['p99_ms']:>9.2f} {result['throughput_per_second']:>8.2f} {result['peak_rss_mb']:>8.1f} "
+              f"{result['errors']:>6}")
+
+    server.shutdown()
+    analyzer.ocr_engine.shutdown()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # A missing baseline must not pass as "no regressions"
+        print(f"\n❌ No baseline at {args.baseline}; run with --save-baseline on the reference machine")
+        return 2
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get('machine', {}).get('cpus') != report['machine']['cpus']:
+        print("⚠️ Baseline was recorded on a machine with a different CPU count; comparing anyway")
+    regressions = compare_with_baseline(report, baseline)
+    if regressions:
+        print("\n❌ Performance regressions against the baseline:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+    print("\n🎉 No regressions against the baseline!")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
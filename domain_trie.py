@@ -0,0 +1,175 @@
+# domain_trie.py - Reversed-label trie for source credibility lookups
+
+import re
+import time
+
+# Multi-label public suffixes common in news URLs. Single-label TLDs (.com, .de, ...)
+# are public suffixes implicitly, so only the multi-label ones need listing here.
+PUBLIC_SUFFIXES = {
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'ltd.uk', 'me.uk', 'net.uk', 'sch.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au', 'co.nz', 'org.nz', 'govt.nz',
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'go.jp', 'co.kr', 'or.kr', 'co.in', 'org.in', 'gov.in',
+    'co.za', 'org.za', 'gov.za', 'com.br', 'org.br', 'gov.br', 'com.ar', 'com.mx', 'gob.mx',
+    'com.cn', 'org.cn', 'gov.cn', 'com.hk', 'com.sg', 'com.my', 'com.ph', 'com.pk', 'com.ng',
+    'com.tr', 'com.ua', 'com.eg', 'com.sa', 'co.il', 'org.il', 'co.id', 'or.id', 'co.th',
+    'com.tw', 'com.vn', 'com.co', 'com.pe', 'com.ve', 'co.ke',
+    # Hosting platforms where every subdomain belongs to a different publisher
+    'blogspot.com', 'wordpress.com', 'substack.com', 'medium.com', 'github.io', 'tumblr.com',
+}
+
+# Host labels that only select a device or protocol flavour of the same site
+EQUIVALENT_HOST_PREFIXES = ('www', 'm', 'mobile', 'amp')
+
+_NAME_CLEANUP = re.compile(r'[^a-z0-9]')
+
+
+def normalize_domain(host):
+    """Lower-case a host name, drop the port, trailing dot and www./m./mobile./amp. labels"""
+    host = host.strip().lower().rsplit('@', 1)[-1].split(':', 1)[0].rstrip('.')
+    labels = host.split('.')
+    while len(labels) > 2 and labels[0] in EQUIVALENT_HOST_PREFIXES:
+        labels.pop(0)
+    return '.'.join(labels)
+
+
+def registrable_domain(domain):
+    """The part of a domain its owner registered: news.bbc.co.uk -> bbc.co.uk"""
+    labels = domain.split('.')
+    for i in range(len(labels) - 1):
+        if '.'.join(labels[i + 1:]) in PUBLIC_SUFFIXES:
+            return '.'.join(labels[i:])
+    return '.'.join(labels[-2:])
+
+
+def _source_name_key(name):
+    name = name.lower()
+    if name.startswith('the '):
+        name = name[4:]
+    return _NAME_CLEANUP.sub('', name)
+
+
+class DomainTrie:
+    """Domains stored label by label from the TLD down, so lookups cost O(labels)"""
+
+    def __init__(self):
+        self._root = {}
+        self._size = 0
+        # publisher name ("Reuters", "The Washington Post") -> (listed domain, value)
+        self._names = {}
+
+    def __len__(self):
+        return self._size
+
+    def add(self, domain, value):
+        domain = normalize_domain(domain)
+        if not domain:
+            return
+        node = self._root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        if None not in node:
+            self._size += 1
+        # Labels are never empty, so None is free to mark "a listed domain ends here"
+        node[None] = (domain, value)
+        self._names.setdefault(_source_name_key(domain.split('.')[0]), (domain, value))
+
+    def lookup(self, domain):
+        """Return (match_type, listed_domain, value) or None.
+
+        match_type is 'exact' or 'subdomain' (a listed domain is a suffix of this one on a
+        label boundary). A listed host says nothing about its siblings: abcnews.go.com
+        does not vouch for espn.go.com or go.com. Listing a registrable domain (bbc.co.uk)
+        covers every host under it.
+        """
+        labels = domain.split('.')
+        node = self._root
+        best = None
+        for depth, label in enumerate(reversed(labels), start=1):
+            node = node.get(label)
+            if node is None:
+                break
+            if None in node:
+                best = (depth, node[None])
+        if best is not None:
+            depth, (listed, value) = best
+            return ('exact' if depth == len(labels) else 'subdomain', listed, value)
+        return None
+
+    def lookup_name(self, name):
+        """Resolve a bare publisher name such as NewsAPI's source.name"""
+        found = self._names.get(_source_name_key(name))
+        if found is None:
+            return None
+        listed, value = found
+        return ('source_name', listed, value)
+
+
+def _legacy_fuzzy_scan(domain, sources):
+    """The linear substring scan the trie replaced, kept for the benchmark"""
+    for listed, score in sources.items():
+        if listed in domain or domain in listed:
+            return listed, score
+    return None
+
+
+# Benchmark the trie against the old linear scan on a 100k-domain list
+if __name__ == "__main__":
+    import random
+    import string
+
+    print("🚀 Benchmarking domain trie vs linear fuzzy scan")
+    print("="*60)
+
+    random.seed(11)
+    tlds = ['com', 'org', 'net', 'co.uk', 'de', 'com.au', 'info']
+    sources = {}
+    while len(sources) < 100_000:
+        name = ''.join(random.choice(string.ascii_lowercase) for _ in range(random.randint(5, 12)))
+        sources[f"{name}.{random.choice(tlds)}"] = random.randint(10, 95)
+
+    start = time.perf_counter()
+    trie = DomainTrie()
+    for listed, score in sources.items():
+        trie.add(listed, score)
+    print(f"\n📚 Built trie for {len(trie)} domains in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    listed_sample = random.sample(list(sources), 50)
+    queries = ([f"news.{d}" for d in listed_sample[:25]] + listed_sample[25:] +
+               [f"unknown-site-{i}.example" for i in range(50)])
+
+    start = time.perf_counter()
+    for query in queries:
+        trie.lookup(normalize_domain(query))
+    trie_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+    start = time.perf_counter()
+    for query in queries:
+        _legacy_fuzzy_scan(query, sources)
+    legacy_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+    print(f"   Linear scan: {legacy_us:10.1f} µs per lookup")
+    print(f"   Domain trie: {trie_us:10.1f} µs per lookup ({legacy_us / trie_us:.0f}x)")
+
+    print("\n🎯 Misfires the trie fixes:")
+    demo = DomainTrie()
+    demo.add('ft.com', 91)
+    demo.add('abcnews.go.com', 80)
+    demo.add('bbc.co.uk', 92)
+    expected = {
+        'microsoft.com': None,
+        'www.ft.com': ('exact', 'ft.com', 91),
+        'markets.ft.com': ('subdomain', 'ft.com', 91),
+        'news.bbc.co.uk': ('subdomain', 'bbc.co.uk', 92),
+        # Siblings and the parent of a listed host are not vouched for by it
+        'espn.go.com': None,
+        'go.com': None,
+    }
+    failed = False
+    for query, want in expected.items():
+        got = demo.lookup(normalize_domain(query))
+        failed = failed or got != want
+        print(f"   {query:16} -> {got} {'✅' if got == want else f'❌ expected {want}'}")
+
+    if failed:
+        raise SystemExit("\n❌ Domain trie lookups differ from the expected matches")
+    print("\n🎉 Benchmark complete!")
@@ -1,12 +1,28 @@
 # enhanced_api.py - Corrected version with Image Analysis
 
-# FIX #2: Added UploadFile and File to the imports
-from fastapi import FastAPI, HTTPException, File, UploadFile
+# FIX #2: Image uploads are streamed from the Request (see upload_stream.py)
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from enhanced_ai import SuperPoweredNewsVerificationAI as NewsVerificationAI
-import uvicorn
+from typing import List, Optional
+import asyncio
+import os
+import time
+from enhanced_ai import SuperPoweredNewsVerificationAI as NewsVerificationAI, MODEL_WAIT_SECONDS, CLAIM_BUDGET_SECONDS
+from model_registry import ModelNotReady
+from ocr_engine import OCRBusy
+from upload_stream import read_image_upload, read_image_uploads, UploadRejected, MAX_BATCH_IMAGES
+from result_stream import stream_format, streaming_response
+from job_queue import JobQueue, JobQueueFull
+from analysis_executor import AnalysisExecutor, ExecutorSaturated
+from result_cache import build_result_cache, text_cache_key, url_cache_key, image_cache_key
+from single_flight import SingleFlight
+from metrics import (render_metrics, register_collector, start_request_timings, current_timings,
+                     HTTP_DURATION, HTTP_IN_FLIGHT)
+from structured_logging import setup_logging, get_logging_stats
 import datetime # FIX #3: Added datetime import
+import sys
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -24,11 +40,204 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Queue-backed: request threads hand records to one writer thread instead of writing to stdout
+setup_logging()
+
+# Run directly, this file only launches the server (start_enhanced_server, at the end);
+# the API is built when uvicorn imports it as enhanced_api, never in the launcher
+SERVES_API = __name__ != "__main__"
+
 print("🚀 Loading Day 2+ Enhanced AI System...")
 # NOTE: Ensure the class name here matches the one in your enhanced_ai.py file
-analyzer = NewsVerificationAI() 
+# Models load in the background, so the server can bind while they warm up
+analyzer = NewsVerificationAI() if SERVES_API else None
+
+# NEW: Models each analysis stage cannot run without
+STAGE_MODELS = {
+    'text': ('fake_news', 'sentiment'),
+    'url': ('fake_news', 'sentiment'),
+    'image': ('fake_news', 'sentiment', 'ocr'),
+    'claim': ('fake_news', 'sentiment'),
+}
+
+# NEW: Blocking model, OCR and fetch work runs in a bounded pool, never on the event loop
+executor = AnalysisExecutor()
+
+# NEW: Repeated texts, URLs and screenshots are answered from a content-addressed cache
+result_cache = build_result_cache()
+CACHE_TTL_SECONDS = {'text': 24 * 3600, 'image': 24 * 3600, 'url': 3600}
+
+# NEW: Identical analyses already running (same cache key) are joined, not started again,
+# so a viral text or URL submitted by hundreds of users at once costs one analysis
+in_flight = SingleFlight()
+
+# NEW: Largest /analyze-batch request; bigger moderation queues are split by the client
+MAX_BATCH_ITEMS = 1000
+
+# NEW: Streamed batches are analyzed in chunks of this many inputs, this many chunks at a time,
+# so the first results go out while the rest of the batch is still queued
+STREAM_CHUNK_SIZES = {'text': 32, 'url': 4}
+STREAM_CHUNK_CONCURRENCY = {'text': 2, 'url': 4}
+STREAM_QUEUE_SIZE = 64    # finished items waiting on a slow client before analysis pauses
+
+
+def cache_result(stage, cache_key, result):
+    """Cache a successful result; a URL result also answers for the canonical URL its fetch confirmed"""
+    if 'error' in result:
+        return
+    result_cache.set(cache_key, result, ttl_seconds=CACHE_TTL_SECONDS[stage])
+    # Redirect target or AMP-to-article pair only; a page's bare rel=canonical claim is not enough
+    if stage == 'url' and result.get('confirmed_canonical_url'):
+        canonical_key = url_cache_key(result['confirmed_canonical_url'])
+        if canonical_key != cache_key:
+            result_cache.set(canonical_key, result, ttl_seconds=CACHE_TTL_SECONDS[stage])
+
+
+def job_handler(stage, fn, cache_key_fn=None):
+    """A job-queue handler running fn on the job's input, through the result cache when keyed.
+
+    Models that are still loading raise ModelNotReady, which the queue retries.
+    """
+    def handle(payload):
+        analyzer.models.wait_ready(STAGE_MODELS[stage], timeout=MODEL_WAIT_SECONDS)
+        cache_key = cache_key_fn(payload['input']) if cache_key_fn else None
+        if cache_key is not None:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        result = fn(payload['input'])
+        if cache_key is not None:
+            cache_result(stage, cache_key, result)
+        return result
+    return handle
+
+
+# NEW: Slow analyses can be queued and polled instead of holding a request open past
+# serverless timeouts; jobs persist in SQLite and a local worker pool drains them
+job_queue = JobQueue({
+    'text': job_handler('text', analyzer.analyze_text_comprehensive, text_cache_key),
+    'url': job_handler('url', analyzer.analyze_url_complete, url_cache_key),
+    'claim': job_handler('claim', analyzer.analyze_claim_comprehensive),
+}).start() if SERVES_API else None
+JOB_LONG_POLL_SECONDS = 25    # longest ?wait= for GET /jobs/{id}, inside typical proxy timeouts
+
+# NEW: Per-stage timings in responses: always with INCLUDE_TIMINGS=1, else per request with ?timings=1
+INCLUDE_TIMINGS = os.environ.get('INCLUDE_TIMINGS', '').lower() in ('1', 'true', 'yes')
+
+
+def export_component_stats():
+    """Queue depths and hit counts the executor, batchers, cache, job queue, fetcher and single-flight keep"""
+    executor_stats = executor.get_stats()
+    cache_stats = result_cache.get_stats()
+    batchers = {'fake_news': analyzer.fake_news_batcher, 'sentiment': analyzer.sentiment_batcher}
+    batcher_stats = {name: batcher.get_stats() for name, batcher in batchers.items()}
+    jobs = job_queue.get_stats()['jobs']
+    fetcher_stats = analyzer.article_fetcher.get_stats()
+    flight_stats = in_flight.get_stats()
+    return [
+        ('executor_running', 'gauge', "Analyses running per executor stage",
+         [({'stage': stage}, stats['running']) for stage, stats in executor_stats.items()]),
+        ('executor_queued', 'gauge', "Analyses waiting for an executor slot",
+         [({'stage': stage}, stats['queued']) for stage, stats in executor_stats.items()]),
+        ('executor_rejected_total', 'counter', "Analyses shed with 503 because a stage was full",
+         [({'stage': stage}, stats['rejected']) for stage, stats in executor_stats.items()]),
+        ('batcher_pending', 'gauge', "Texts waiting for the next model batch",
+         [({'model': name}, stats['pending']) for name, stats in batcher_stats.items()]),
+        ('batcher_batches_total', 'counter', "Model batches run",
+         [({'model': name}, stats['batches']) for name, stats in batcher_stats.items()]),
+        ('batcher_items_total', 'counter', "Texts run through the model batches",
+         [({'model': name}, stats['items']) for name, stats in batcher_stats.items()]),
+        ('cache_lookups_total', 'counter', "Result cache lookups by outcome",
+         [({'outcome': 'hit'}, cache_stats['hits']), ({'outcome': 'miss'}, cache_stats['misses'])]),
+        ('cache_entries', 'gauge', "Results held in the in-memory cache", [({}, cache_stats['entries'])]),
+        ('jobs', 'gauge', "Jobs in the queue by status",
+         [({'status': status}, count) for status, count in jobs.items()]),
+        ('article_downloads_total', 'counter', "Article and feed downloads started",
+         [({}, fetcher_stats['downloads'])]),
+        ('article_fetches_coalesced_total', 'counter', "Fetches served by another in-flight download",
+         [({}, fetcher_stats['coalesced'])]),
+        ('analyses_coalesced_total', 'counter', "Requests that joined an identical analysis already running",
+         [({}, flight_stats['coalesced'])]),
+        ('analyses_in_flight', 'gauge', "Distinct analyses running for API requests", [({}, flight_stats['in_flight'])]),
+    ]
+
+
+register_collector(export_component_stats)
 print("✅ Enhanced API ready to serve requests!")
 
+
+async def require_models(stage):
+    """Wait (without holding a worker thread) for the stage's models, or answer 503"""
+    try:
+        await analyzer.models.wait_ready_async(STAGE_MODELS.get(stage, ()), timeout=MODEL_WAIT_SECONDS)
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+
+async def run_analysis(stage, fn, *args):
+    """Run a synchronous analyzer call in the executor, shedding load with 503 when saturated"""
+    await require_models(stage)
+    try:
+        return await executor.run(stage, fn, *args)
+    except (ExecutorSaturated, OCRBusy) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+async def cached_analysis(stage, cache_key, fn, *args):
+    """Return (result, cache_hit), running the analysis only when the input has not been seen
+    
+    A request arriving while the same input is being analyzed waits for that analysis.
+    """
+    cached = await result_cache.get_async(cache_key)
+    if cached is not None:
+        return cached, True
+
+    result = await in_flight.do(cache_key, analyze_and_cache, stage, cache_key, fn, *args)
+    return result, False
+
+
+async def analyze_and_cache(stage, cache_key, fn, *args):
+    result = await run_analysis(stage, fn, *args)
+    # Serializing and an ANALYSIS_CACHE_DB write stay off the event loop
+    await asyncio.to_thread(cache_result, stage, cache_key, result)
+    return result
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Latency histogram per route, and the per-request timings collector when asked for"""
+    if INCLUDE_TIMINGS or request.query_params.get('timings', '').lower() in ('1', 'true', 'yes'):
+        # call_next runs the endpoint in a copy of this context, sharing the dict
+        start_request_timings()
+    HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        HTTP_IN_FLIGHT.dec()
+        # The route template, not the raw path, so job IDs don't each become a series
+        route = request.scope.get('route')
+        HTTP_DURATION.observe(time.perf_counter() - started, method=request.method,
+                              route=getattr(route, 'path', 'unmatched'), status=status)
+
+
+def with_timings(response):
+    """Add the request's per-stage timings to a response body when they were asked for"""
+    timings = current_timings()
+    if timings is not None:
+        response["timings"] = dict(timings)
+    return response
+
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    executor.shutdown()
+    job_queue.shutdown()
+    analyzer.ocr_engine.shutdown()
+
 # Request models
 class URLAnalysisRequest(BaseModel):
     url: str
@@ -36,6 +245,20 @@ class URLAnalysisRequest(BaseModel):
 class TextAnalysisRequest(BaseModel):
     text: str
 
+class BatchItem(BaseModel):
+    text: Optional[str] = None
+    url: Optional[str] = None
+
+class BatchAnalysisRequest(BaseModel):
+    items: List[BatchItem]
+
+class ClaimAnalysisRequest(BaseModel):
+    claim: str
+
+class JobRequest(BaseModel):
+    type: str
+    input: str
+
 # API endpoints
 @app.get("/")
 async def home():
@@ -52,7 +275,15 @@ async def home():
         "endpoints": {
             "analyze_url": "/analyze-url",
             "analyze_text": "/analyze-text",
-            "analyze_image": "/analyze-image (NEW!)"
+            "analyze_image": "/analyze-image (NEW!)",
+            "analyze_claim": "/analyze-claim",
+            "analyze_claim_stream": "/analyze-claim/stream",
+            "analyze_batch": "/analyze-batch",
+            "analyze_batch_stream": "/analyze-batch/stream",
+            "analyze_batch_images": "/analyze-batch/images",
+            "jobs": "/jobs",
+            "job_status": "/jobs/{job_id}?wait=seconds",
+            "metrics": "/metrics"
         }
     }
 
@@ -63,11 +294,13 @@ async def analyze_url(request: URLAnalysisRequest):
         if not request.url.startswith(('http://', 'https://')):
             raise HTTPException(status_code=400, detail="Invalid URL format.")
         
-        result = analyzer.analyze_url_complete(request.url)
+        result, cache_hit = await cached_analysis(
+            'url', url_cache_key(request.url), analyzer.analyze_url_complete, request.url
+        )
         if 'error' in result:
             raise HTTPException(status_code=400, detail=result['error'])
         
-        return {"success": True, "result": result}
+        return with_timings({"success": True, "cache_hit": cache_hit, "result": result})
         
     except HTTPException as http_exc:
         raise http_exc
@@ -75,18 +308,37 @@ async def analyze_url(request: URLAnalysisRequest):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
 
-# This new endpoint is correct as you had it.
-@app.post("/analyze-image")
-async def analyze_image(file: UploadFile = File(...)):
+# NEW: Multipart body documented by hand, since the upload is streamed rather than parsed by FastAPI
+IMAGE_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    }
+}
+
+
+@app.post("/analyze-image", openapi_extra=IMAGE_UPLOAD_BODY)
+async def analyze_image(request: Request):
     """Analyze text from an uploaded image"""
     try:
-        image_bytes = await file.read()
-        result = analyzer.analyze_image_complete(image_bytes)
+        # Streamed with size, type and dimension checks before the whole body has arrived
+        try:
+            image_bytes = await read_image_upload(request)
+        except UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+        
+        result, cache_hit = await cached_analysis(
+            'image', image_cache_key(image_bytes), analyzer.analyze_image_complete, image_bytes
+        )
         
         if 'error' in result:
             raise HTTPException(status_code=400, detail=result['error'])
         
-        return {"success": True, "analysis_type": "image_analysis", "result": result}
+        return with_timings({"success": True, "analysis_type": "image_analysis", "cache_hit": cache_hit, "result": result})
 
     except HTTPException as http_exc:
         raise http_exc
@@ -103,11 +355,13 @@ async def analyze_text(request: TextAnalysisRequest):
         if not request.text or len(request.text) < 10:
             raise HTTPException(status_code=400, detail="Text is too short for meaningful analysis.")
         
-        result = analyzer.analyze_text_comprehensive(request.text)
+        result, cache_hit = await cached_analysis(
+            'text', text_cache_key(request.text), analyzer.analyze_text_comprehensive, request.text
+        )
         if 'error' in result:
             raise HTTPException(status_code=400, detail=result['error'])
 
-        return {"success": True, "analysis_type": "text_analysis", "result": result}
+        return with_timings({"success": True, "analysis_type": "text_analysis", "cache_hit": cache_hit, "result": result})
         
     except HTTPException as http_exc:
         raise http_exc
@@ -115,10 +369,390 @@ async def analyze_text(request: TextAnalysisRequest):
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred during text analysis: {str(e)}")
 
 
+async def run_batch(stage, unique, fn):
+    """Analyze the cache misses among unique {cache_key: input} with one batch call.
+
+    Returns {cache_key: (result, cache_hit)}. Successful results are cached like the
+    single-item endpoints do, so a batch and a later single request share them, and
+    misses already being analyzed for another request are waited for, not re-run.
+    """
+    outcomes = {}
+    misses = []
+    for cache_key, value in unique.items():
+        cached = await result_cache.get_async(cache_key)
+        if cached is not None:
+            outcomes[cache_key] = (cached, True)
+        else:
+            misses.append(cache_key)
+
+    async def analyze(keys):
+        results = await run_analysis(stage, fn, [unique[cache_key] for cache_key in keys])
+        for cache_key, result in zip(keys, results):
+            await asyncio.to_thread(cache_result, stage, cache_key, result)
+        return dict(zip(keys, results))
+
+    if misses:
+        analyzed = await in_flight.do_many(misses, analyze)
+        for cache_key in misses:
+            outcomes[cache_key] = (analyzed[cache_key], False)
+    return outcomes
+
+
+def batch_item_result(index, item_type, outcome):
+    result, cache_hit = outcome
+    if 'error' in result:
+        return {"index": index, "type": item_type, "success": False, "error": result['error']}
+    return {"index": index, "type": item_type, "success": True, "cache_hit": cache_hit, "result": result}
+
+
+def validate_batch_items(items):
+    """Check every batch item and dedupe the valid ones.
+
+    Returns (results, keys, texts, urls): results holds an error entry for each bad
+    item and None elsewhere, keys the (stage, cache_key) of each good item, and
+    texts/urls map each distinct cache_key to its input. A bad item fails alone
+    instead of failing the batch; only an empty or oversized batch raises.
+    """
+    if not items:
+        raise HTTPException(status_code=400, detail="The batch has no items.")
+    if len(items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_ITEMS} items per batch.")
+
+    results = [None] * len(items)
+    keys = [None] * len(items)
+    texts, urls = {}, {}
+    for index, item in enumerate(items):
+        if (item.text is None) == (item.url is None):
+            results[index] = {"index": index, "type": None, "success": False,
+                              "error": "Each item needs exactly one of 'text' or 'url'."}
+        elif item.text is not None:
+            if len(item.text) < 10:
+                results[index] = {"index": index, "type": "text", "success": False,
+                                  "error": "Text is too short for meaningful analysis."}
+            else:
+                keys[index] = ('text', text_cache_key(item.text))
+                texts[keys[index][1]] = item.text
+        elif not item.url.startswith(('http://', 'https://')):
+            results[index] = {"index": index, "type": "url", "success": False, "error": "Invalid URL format."}
+        else:
+            keys[index] = ('url', url_cache_key(item.url))
+            urls.setdefault(keys[index][1], item.url)
+    return results, keys, texts, urls
+
+
+@app.post("/analyze-batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """Analyze a list of texts and URLs in one request.
+
+    Identical inputs are analyzed once, texts share model batches, and URLs are
+    fetched concurrently. Results (or per-item errors) come back in input order.
+    """
+    try:
+        results, keys, texts, urls = validate_batch_items(request.items)
+
+        # The text and URL sub-batches run side by side, each in one executor slot
+        text_outcomes, url_outcomes = await asyncio.gather(
+            run_batch('text', texts, analyzer.analyze_texts_comprehensive),
+            run_batch('url', urls, analyzer.analyze_urls_complete),
+        )
+        outcomes = {'text': text_outcomes, 'url': url_outcomes}
+        for index, key in enumerate(keys):
+            if key is not None:
+                results[index] = batch_item_result(index, key[0], outcomes[key[0]][key[1]])
+
+        return with_timings({
+            "success": True,
+            "count": len(results),
+            "unique": len(texts) + len(urls),
+            "results": results
+        })
+
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred during batch analysis: {str(e)}")
+
+
+async def batch_events(validated):
+    """Yield ('item', result) for each batch item as soon as it is ready, then ('done', summary).
+
+    Invalid items and cache hits go out first, in milliseconds. The misses are then
+    analyzed chunk by chunk, and each chunk's items are emitted as it finishes. Items
+    arrive in completion order; their "index" gives the input position.
+    """
+    started = time.perf_counter()
+    results, keys, texts, urls = validated
+    positions = {}
+    for index, key in enumerate(keys):
+        if key is not None:
+            positions.setdefault(key, []).append(index)
+
+    def item_events(stage, cache_key, outcome):
+        for index in positions[(stage, cache_key)]:
+            yield 'item', batch_item_result(index, stage, outcome)
+
+    for result in results:
+        if result is not None:
+            yield 'item', result
+    del results
+
+    misses = {'text': {}, 'url': {}}
+    for stage, unique in (('text', texts), ('url', urls)):
+        for cache_key, value in unique.items():
+            cached = await result_cache.get_async(cache_key)
+            if cached is None:
+                misses[stage][cache_key] = value
+                continue
+            for event in item_events(stage, cache_key, (cached, True)):
+                yield event
+
+    # Bounded, so a slow reader pauses the analysis instead of piling up results
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    functions = {'text': analyzer.analyze_texts_comprehensive, 'url': analyzer.analyze_urls_complete}
+
+    async def analyze_chunks(stage, chunks):
+        for chunk in chunks:
+            try:
+                outcomes = await run_batch(stage, chunk, functions[stage])
+            except HTTPException as e:
+                outcomes = {cache_key: ({'error': e.detail}, False) for cache_key in chunk}
+            for cache_key, outcome in outcomes.items():
+                await queue.put((stage, cache_key, outcome))
+
+    workers = []
+    for stage, unique in misses.items():
+        cache_keys = list(unique)
+        size = STREAM_CHUNK_SIZES[stage]
+        # One shared iterator, so the concurrent workers take chunks in turn
+        chunks = iter([{k: unique[k] for k in cache_keys[i:i + size]} for i in range(0, len(cache_keys), size)])
+        workers += [asyncio.ensure_future(analyze_chunks(stage, chunks))
+                    for _ in range(min(STREAM_CHUNK_CONCURRENCY[stage], -(-len(cache_keys) // size)))]
+
+    async def close_when_done():
+        await asyncio.gather(*workers, return_exceptions=True)
+        await queue.put(None)
+
+    closer = asyncio.ensure_future(close_when_done())
+    try:
+        while True:
+            finished = await queue.get()
+            if finished is None:
+                break
+            for event in item_events(*finished):
+                yield event
+    finally:
+        # The client went away (or the stream ended): stop starting new chunks
+        for task in workers + [closer]:
+            task.cancel()
+
+    yield 'done', {
+        "count": len(keys),
+        "unique": len(texts) + len(urls),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+@app.post("/analyze-batch/stream")
+async def analyze_batch_stream(batch: BatchAnalysisRequest, request: Request):
+    """/analyze-batch as a stream: one NDJSON line (or SSE event) per item as it finishes.
+
+    Pick the format with ?format=ndjson|sse or an Accept: text/event-stream header.
+    """
+    # Bad batches fail with a status code before the stream starts
+    validated = validate_batch_items(batch.items)
+    return streaming_response(batch_events(validated), stream_format(request))
+
+
+# NEW: Any number of 'files' parts, documented by hand like IMAGE_UPLOAD_BODY
+BATCH_IMAGE_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"files": {"type": "array", "maxItems": MAX_BATCH_IMAGES,
+                                     "items": {"type": "string", "format": "binary"}}},
+            "required": ["files"],
+        }}},
+    }
+}
+
+
+@app.post("/analyze-batch/images", openapi_extra=BATCH_IMAGE_UPLOAD_BODY)
+async def analyze_batch_images(request: Request):
+    """Analyze several uploaded images; results (or per-image errors) in upload order"""
+    try:
+        try:
+            uploads = await read_image_uploads(request)
+        except UploadRejected as e:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+        keys = [None if upload.error else image_cache_key(upload.image) for upload in uploads]
+        images = {key: upload.image for key, upload in zip(keys, uploads) if key is not None}
+        outcomes = await run_batch('image', images, analyzer.analyze_images_complete)
+
+        results = []
+        for index, (upload, key) in enumerate(zip(uploads, keys)):
+            if key is None:
+                item = {"index": index, "type": "image", "success": False, "error": upload.error.detail}
+            else:
+                item = batch_item_result(index, "image", outcomes[key])
+            item["filename"] = upload.filename
+            results.append(item)
+
+        return with_timings({
+            "success": True,
+            "analysis_type": "image_batch_analysis",
+            "count": len(results),
+            "unique": len(images),
+            "results": results
+        })
+
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred during image analysis: {str(e)}")
+
+
+@app.post("/analyze-claim")
+async def analyze_claim(request: ClaimAnalysisRequest):
+    """Full claim analysis: AI model, live news coverage and fact-check databases"""
+    try:
+        if not request.claim or len(request.claim) < 10:
+            raise HTTPException(status_code=400, detail="Claim is too short for meaningful analysis.")
+
+        # Not cached (news coverage changes by the minute), but identical claims in flight are joined
+        result = await in_flight.do(f"claim:{text_cache_key(request.claim)}", run_analysis, 'claim',
+                                    analyzer.analyze_claim_comprehensive, request.claim)
+        return with_timings({"success": True, "analysis_type": "claim_analysis", "result": result})
+
+    except HTTPException as http_exc:
+        raise http_exc
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"An unexpected error occurred during claim analysis: {str(e)}")
+
+
+async def claim_events(claim):
+    """Yield ('stage', partial result) as each claim stage finishes, then ('result', full analysis)"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    started = time.perf_counter()
+
+    def on_stage(name, status, result):
+        # Called on the analysis thread; handed to the event loop in finishing order
+        loop.call_soon_threadsafe(queue.put_nowait, {"stage": name, "status": status, "result": result})
+
+    analysis = asyncio.ensure_future(run_analysis(
+        'claim', analyzer.analyze_claim_comprehensive, claim, True, CLAIM_BUDGET_SECONDS, on_stage
+    ))
+    analysis.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while True:
+            stage = await queue.get()
+            if stage is None:
+                break
+            stage["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            yield 'stage', stage
+
+        try:
+            result = analysis.result()
+        except HTTPException as e:
+            yield 'error', {"status_code": e.status_code, "detail": e.detail}
+            return
+        except Exception as e:
+            yield 'error', {"status_code": 500, "detail": f"An unexpected error occurred during claim analysis: {str(e)}"}
+            return
+        yield 'result', {"result": result, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)}
+    finally:
+        analysis.cancel()
+
+
+@app.post("/analyze-claim/stream")
+async def analyze_claim_stream(claim: ClaimAnalysisRequest, request: Request):
+    """/analyze-claim as a stream: each stage's result as it finishes, then the final score.
+
+    Pick the format with ?format=ndjson|sse or an Accept: text/event-stream header.
+    """
+    if not claim.claim or len(claim.claim) < 10:
+        raise HTTPException(status_code=400, detail="Claim is too short for meaningful analysis.")
+    await require_models('claim')
+    return streaming_response(claim_events(claim.claim), stream_format(request))
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    """Queue a text, URL or claim analysis and return its job ID immediately"""
+    if request.type not in job_queue.handlers:
+        raise HTTPException(status_code=400, detail=f"Job type must be one of: {', '.join(job_queue.handlers)}.")
+    if request.type == 'url':
+        if not request.input.startswith(('http://', 'https://')):
+            raise HTTPException(status_code=400, detail="Invalid URL format.")
+    elif len(request.input) < 10:
+        raise HTTPException(status_code=400, detail="Input is too short for meaningful analysis.")
+
+    try:
+        job = await job_queue.submit_async(request.type, {'input': request.input})
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return {"success": True, "job_id": job['job_id'], "status": job['status'], "poll": f"/jobs/{job['job_id']}"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """Job status and, once finished, its result or error.
+
+    With ?wait=N (up to JOB_LONG_POLL_SECONDS) the request is held until the job
+    finishes or N seconds pass, so clients can long-poll instead of busy-polling.
+    """
+    wait = min(max(wait, 0.0), JOB_LONG_POLL_SECONDS)
+    job = await job_queue.wait_async(job_id, wait) if wait else await job_queue.get_async(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    return {"success": job['status'] != 'failed', **job}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint: stage latency histograms, call counters and in-flight gauges"""
+    # Collectors read SQLite (job counts), so rendering runs off the event loop
+    text = await asyncio.to_thread(render_metrics)
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/livez")
+async def liveness_check():
+    """Liveness probe: the process is up and serving the event loop"""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+async def readiness_check():
+    """Readiness probe: 200 only once the required models are loaded and warmed up"""
+    ready = analyzer.models.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "models": analyzer.models.get_status()}
+    )
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "ai_models": "loaded"}
+    return {
+        "status": "healthy" if analyzer.models.is_ready() else "starting",
+        "ai_models": analyzer.models.get_status(),
+        "inference_backend": analyzer.inference_backend,
+        "html_extractor": analyzer.html_extractor.name,
+        "tokenization": analyzer.tokenization.get_stats(),
+        "ocr": analyzer.ocr_engine.get_stats(),
+        "executor": executor.get_stats(),
+        "fetcher": analyzer.article_fetcher.get_stats(),
+        "single_flight": in_flight.get_stats(),
+        "cache": result_cache.get_stats(),
+        "jobs": await job_queue.get_stats_async(),
+        "logging": get_logging_stats(),
+        "feeds": analyzer.feed_ingestor.get_stats(),
+        "news_index": analyzer.news_index.get_stats()
+    }
 
 
 @app.get("/test")
@@ -135,8 +769,11 @@ async def comprehensive_test():
 def start_enhanced_server():
     print("🌐 Starting Enhanced News Verification API (Day 2+)...")
     print("📚 API documentation: http://localhost:8000/docs")
-    print("🛑 Press Ctrl+C to stop")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    print("🛑 Press Ctrl+C to stop", flush=True)
+    # Serve through the uvicorn CLI, which imports this module by name: OCR worker processes
+    # re-import a script run as __main__, and would each build a second copy of the API
+    os.execvp(sys.executable, [sys.executable, '-m', 'uvicorn', 'enhanced_api:app',
+                               '--host', '0.0.0.0', '--port', '8000'])
 
 if __name__ == "__main__":
     start_enhanced_server()
\ No newline at end of file
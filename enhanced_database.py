@@ -2,8 +2,21 @@
 
 import requests
 import json
+import logging
 from datetime import datetime, timedelta
 import time
+from signal_matcher import DEFAULT_SIGNAL_MATCHER
+from factcheck_index import FactCheckIndex
+from domain_trie import DomainTrie, normalize_domain
+from metrics import traced
+
+logger = logging.getLogger(__name__)
+
+# requests (connect, read) timeouts for the claim pipeline's API calls; together they fit the
+# 8 s 'newsapi' and 'google_fact_check' deadlines in enhanced_ai.CLAIM_STAGE_DEADLINES, so a
+# call the pipeline has stopped waiting for doesn't hold a claim-stage thread much longer
+NEWSAPI_TIMEOUT = (3, 5)
+FACTCHECK_TIMEOUT = (3, 5)
 
 class EnhancedDatabase:
     def __init__(self):
@@ -15,8 +28,11 @@ class EnhancedDatabase:
         self.trusted_sources = self._load_trusted_sources()
         self.unreliable_sources = self._load_unreliable_sources()
         
+        self.source_index = self._build_source_index()
+        
         # COMPREHENSIVE Fact-Check Database
         self.fact_check_database = self._load_comprehensive_factcheck_db()
+        self.fact_check_index = FactCheckIndex(self.fact_check_database)
         
         # Topic Keywords for better matching
         self.topic_keywords = self._load_topic_keywords()
@@ -106,6 +122,50 @@ class EnhancedDatabase:
             'duffelblg.com': 60, 'waterfordwhispersnews.com': 67
         }
     
+    def _build_source_index(self):
+        """Reversed-label trie over both source lists; trusted wins if a domain is in both"""
+        index = DomainTrie()
+        for domain, score in self.unreliable_sources.items():
+            index.add(domain, ('unreliable', score))
+        for domain, score in self.trusted_sources.items():
+            index.add(domain, ('trusted', score))
+        return index
+    
+    def load_source_list(self, path, category, default_score=None):
+        """Load a 'domain[,score]' per line list (100k+ domains is fine) as trusted or unreliable
+
+        As in _build_source_index, trusted wins: an unreliable entry for a domain that is
+        already trusted is kept in unreliable_sources but doesn't change its verdict.
+        Returns the number of domains whose verdict the list set.
+        """
+        if category not in ('trusted', 'unreliable'):
+            raise ValueError("category must be 'trusted' or 'unreliable'")
+        if default_score is None:
+            default_score = 80 if category == 'trusted' else 20
+        sources = self.trusted_sources if category == 'trusted' else self.unreliable_sources
+        
+        added = skipped = 0
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                domain, _, score = line.partition(',')
+                domain = normalize_domain(domain)
+                score = int(score) if score.strip() else default_score
+                sources[domain] = score
+                if category == 'unreliable' and domain in self.trusted_sources:
+                    skipped += 1
+                    continue
+                self.source_index.add(domain, (category, score))
+                added += 1
+        
+        if skipped:
+            logger.warning("Source list names already trusted domains; they stay trusted",
+                           extra={'category': category, 'domains': skipped, 'path': path})
+        logger.info("Loaded source list", extra={'category': category, 'domains': added, 'path': path})
+        return added
+    
     def _load_comprehensive_factcheck_db(self):
         """COMPREHENSIVE fact-check database covering major topics"""
         return {
@@ -222,6 +282,24 @@ class EnhancedDatabase:
             }
         }
     
+    def load_fact_checks(self, entries):
+        """Merge extra fact-checks (e.g. a ClaimReview export) into the database and index
+        
+        entries: {topic: {'status', 'confidence', 'source', 'details', 'keywords'}} or a path
+        to a JSON file with that shape.
+        """
+        if isinstance(entries, str):
+            with open(entries, encoding='utf-8') as f:
+                entries = json.load(f)
+        
+        for topic, fact_data in entries.items():
+            topic = topic.lower()
+            self.fact_check_database[topic] = fact_data
+            self.fact_check_index.add(topic, fact_data)
+        
+        logger.info("Loaded fact checks", extra={'added': len(entries), 'topics': len(self.fact_check_database)})
+        return len(entries)
+    
     def _load_topic_keywords(self):
         """Keywords to improve topic matching"""
         return {
@@ -234,55 +312,39 @@ class EnhancedDatabase:
         }
     
     def check_source_credibility_enhanced(self, url):
-        """ENHANCED source checking with fuzzy matching"""
+        """ENHANCED source checking with exact and subdomain matching"""
         try:
             from urllib.parse import urlparse
-            domain = urlparse(url).netloc.lower()
+            # Drops the port and leading www./m./mobile./amp. labels (not every 'm.' in the host)
+            domain = normalize_domain(urlparse(url).netloc)
             
-            # Remove common prefixes
-            domain = domain.replace('www.', '').replace('m.', '').replace('mobile.', '')
-            
-            print(f"🌐 Enhanced source check for: {domain}")
-            
-            # Exact matches first
-            if domain in self.trusted_sources:
-                return {
-                    'credibility_score': self.trusted_sources[domain],
-                    'category': 'trusted',
-                    'source': domain,
-                    'domain': domain,
-                    'match_type': 'exact'
-                }
-            
-            if domain in self.unreliable_sources:
-                return {
-                    'credibility_score': self.unreliable_sources[domain],
-                    'category': 'unreliable', 
-                    'source': domain,
-                    'domain': domain,
-                    'match_type': 'exact'
-                }
+            logger.debug("Source check", extra={'domain': domain})
             
-            # Fuzzy matching for subdomains
-            for trusted_domain, score in self.trusted_sources.items():
-                if trusted_domain in domain or domain in trusted_domain:
+            # Exact and subdomain matches in O(labels); a bare
+            # publisher name (NewsAPI's source.name) is resolved by name instead
+            match = self.source_index.lookup(domain) if '.' in domain else self.source_index.lookup_name(domain)
+            if match is not None:
+                match_type, listed_domain, (category, score) = match
+                if match_type == 'exact':
                     return {
-                        'credibility_score': max(score - 5, 50),  # Slight penalty for subdomain
-                        'category': 'trusted_subdomain',
-                        'source': trusted_domain,
+                        'credibility_score': score,
+                        'category': category,
+                        'source': listed_domain,
                         'domain': domain,
-                        'match_type': 'fuzzy'
-                    }
-            
-            for unreliable_domain, score in self.unreliable_sources.items():
-                if unreliable_domain in domain or domain in unreliable_domain:
-                    return {
-                        'credibility_score': min(score + 5, 50),  # Slight bonus for subdomain
-                        'category': 'unreliable_subdomain',
-                        'source': unreliable_domain, 
-                        'domain': domain,
-                        'match_type': 'fuzzy'
+                        'match_type': 'exact'
                     }
+                
+                if category == 'trusted':
+                    credibility_score = max(score - 5, 50)  # Slight penalty for subdomain
+                else:
+                    credibility_score = min(score + 5, 50)  # Slight bonus for subdomain
+                return {
+                    'credibility_score': credibility_score,
+                    'category': f'{category}_subdomain',
+                    'source': listed_domain,
+                    'domain': domain,
+                    'match_type': match_type
+                }
             
             # Check for government domains
             if domain.endswith('.gov') or domain.endswith('.edu'):
@@ -312,21 +374,21 @@ class EnhancedDatabase:
     
     def enhanced_fact_check(self, claim):
         """ENHANCED fact-checking with keyword matching and API integration"""
-        print(f"✅ Enhanced fact-checking: '{claim[:60]}...'")
+        logger.debug("Fact-checking claim", extra={'claim': claim[:200]})
         
+        local_checks = self.match_local_fact_checks(claim)
+        google_checks = self.search_google_fact_checks(claim)
+        return self.combine_fact_checks(claim, local_checks, google_checks)
+    
+    def match_local_fact_checks(self, claim):
+        """Fact-checks from the local database whose topic or keywords appear in the claim"""
         claim_lower = claim.lower()
         fact_checks = []
         
-        # Check against comprehensive database with keyword matching
-        for topic, fact_data in self.fact_check_database.items():
-            # Check topic name
-            topic_match = topic in claim_lower
-            
-            # Check keywords
-            keyword_matches = 0
-            for keyword in fact_data.get('keywords', []):
-                if keyword in claim_lower:
-                    keyword_matches += 1
+        # Candidate topics come from the inverted index, so this only touches topics
+        # that share at least one term with the claim
+        for topic, topic_match, keyword_matches in self.fact_check_index.search(claim_lower):
+            fact_data = self.fact_check_database[topic]
             
             # If we have topic match OR multiple keyword matches
             if topic_match or keyword_matches >= 2:
@@ -347,21 +409,30 @@ class EnhancedDatabase:
                     'match_type': 'topic' if topic_match else f'keywords ({keyword_matches})'
                 })
         
-        # Try Google Fact Check API if available
-        if self.google_factcheck_key != "YOUR_GOOGLE_KEY_HERE":
-            try:
-                google_facts = self._query_google_factcheck(claim)
-                fact_checks.extend(google_facts)
-            except Exception as e:
-                print(f"⚠️ Google Fact Check API failed: {e}")
+        return fact_checks
+    
+    def search_google_fact_checks(self, claim):
+        """Google Fact Check API results, or [] when the key is missing or the call fails"""
+        if self.google_factcheck_key == "YOUR_GOOGLE_KEY_HERE":
+            return []
+        try:
+            return self._query_google_factcheck(claim)
+        except Exception as e:
+            logger.warning("Google Fact Check API failed: %s", e)
+            return []
+    
+    def combine_fact_checks(self, claim, local_checks, google_checks):
+        """Local matches first, then Google; fall back to pattern analysis when both are empty"""
+        fact_checks = list(local_checks) + list(google_checks)
         
         # If no specific fact-checks found, do content-based analysis
         if not fact_checks:
             fact_checks.append(self._analyze_claim_patterns(claim))
         
-        print(f"📋 Enhanced fact-check found {len(fact_checks)} results")
+        logger.debug("Fact-check results", extra={'results': len(fact_checks)})
         return fact_checks
     
+    @traced('_query_google_factcheck')
     def _query_google_factcheck(self, claim):
         """Query Google Fact Check Tools API"""
         url = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
@@ -371,7 +442,7 @@ class EnhancedDatabase:
             'languageCode': 'en'
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = requests.get(url, params=params, timeout=FACTCHECK_TIMEOUT)
         if response.status_code == 200:
             data = response.json()
             google_facts = []
@@ -396,22 +467,11 @@ class EnhancedDatabase:
     
     def _analyze_claim_patterns(self, claim):
         """Analyze claim patterns when no specific fact-checks found"""
-        claim_lower = claim.lower()
-        
-        # Conspiracy indicators
-        conspiracy_words = ['secret', 'hidden', 'cover up', 'they dont want you to know', 
-                           'mainstream media lies', 'wake up', 'sheeple', 'deep state']
-        conspiracy_count = sum(1 for word in conspiracy_words if word in claim_lower)
-        
-        # Sensational indicators
-        sensational_words = ['shocking', 'unbelievable', 'miracle', 'instant', 'guaranteed',
-                            'doctors hate', 'one weird trick', 'exposed', 'revealed']
-        sensational_count = sum(1 for word in sensational_words if word in claim_lower)
-        
-        # Credible indicators
-        credible_words = ['research', 'study', 'according to', 'evidence', 'data shows',
-                         'peer reviewed', 'published', 'university', 'journal']
-        credible_count = sum(1 for word in credible_words if word in claim_lower)
+        # Conspiracy, sensational and credible indicators in a single pass
+        terms = DEFAULT_SIGNAL_MATCHER.count_terms(claim)
+        conspiracy_count = terms['conspiracy']
+        sensational_count = terms['sensational']
+        credible_count = terms['credible_research']
         
         # Calculate pattern-based assessment
         if conspiracy_count >= 2 or sensational_count >= 3:
@@ -442,10 +502,11 @@ class EnhancedDatabase:
             'match_type': 'content_pattern'
         }
     
+    @traced('search_news_with_newsapi')
     def search_news_with_newsapi(self, query, days_back=3):
         """Search recent news using NewsAPI"""
         if self.newsapi_key == "YOUR_NEWSAPI_KEY_HERE":
-            print("⚠️ NewsAPI key not configured, using RSS fallback")
+            logger.debug("NewsAPI key not configured, using RSS fallback")
             return []
         
         try:
@@ -463,7 +524,7 @@ class EnhancedDatabase:
                 'pageSize': 20
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = requests.get(url, params=params, timeout=NEWSAPI_TIMEOUT)
             if response.status_code == 200:
                 data = response.json()
                 
@@ -486,16 +547,19 @@ class EnhancedDatabase:
                 # Sort by source credibility
                 news_results.sort(key=lambda x: x['credibility_score'], reverse=True)
                 
-                print(f"✅ NewsAPI found {len(news_results)} articles")
+                logger.debug("NewsAPI results", extra={'articles': len(news_results)})
                 return news_results[:10]  # Return top 10
             
         except Exception as e:
-            print(f"⚠️ NewsAPI search failed: {e}")
+            logger.warning("NewsAPI search failed: %s", e)
         
         return []
 
 # Test the enhanced database
 if __name__ == "__main__":
+    from structured_logging import setup_logging
+    setup_logging(fmt='text')
+    
     print("🚀 Testing Enhanced Database System")
     print("="*60)
     
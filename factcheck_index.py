@@ -0,0 +1,133 @@
+# factcheck_index.py - Inverted keyword index for the local fact-check database
+
+import threading
+from collections import deque
+
+
+class FactCheckIndex:
+    """Maps every topic name and keyword to the topics that use it.
+
+    Candidate retrieval scans the claim once with an Aho-Corasick automaton over all
+    indexed terms, so lookups cost O(len(claim) + matches) however large the database
+    grows. Terms match as substrings of the lower-cased claim, exactly like the
+    original `keyword in claim_lower` loop did.
+    """
+
+    def __init__(self, fact_check_database=None):
+        self._topics = []          # topic id -> topic name, in database order
+        self._topic_ids = {}       # topic name -> topic id
+        self._term_ids = {}        # normalized term -> term id
+        self._postings = []        # term id -> list of [topic id, is_topic_name, multiplicity]
+        self._always = {}          # topic id -> empty keywords, which match every claim
+
+        self._lock = threading.Lock()
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._dirty = False
+
+        for topic, fact_data in (fact_check_database or {}).items():
+            self.add(topic, fact_data)
+
+    def __len__(self):
+        return len(self._topics)
+
+    def add(self, topic, fact_data):
+        """Index (or re-index) one topic; the automaton is rebuilt on the next search"""
+        with self._lock:
+            topic_id = self._topic_ids.get(topic)
+            if topic_id is None:
+                topic_id = len(self._topics)
+                self._topics.append(topic)
+                self._topic_ids[topic] = topic_id
+            else:
+                self._unindex(topic_id)
+
+            self._post(topic.lower(), topic_id, True)
+            for keyword in fact_data.get('keywords', []):
+                if keyword:
+                    self._post(keyword.lower(), topic_id, False)
+                else:
+                    self._always[topic_id] = self._always.get(topic_id, 0) + 1
+            self._dirty = True
+
+    def search(self, claim):
+        """Return [(topic, topic_match, keyword_matches)] for every topic the claim touches"""
+        with self._lock:
+            if self._dirty:
+                self._build()
+            goto, fail, output = self._goto, self._fail, self._output
+            postings = self._postings
+
+            found = set()
+            node = 0
+            for char in claim.lower():
+                while node and char not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(char, 0)
+                if output[node]:
+                    found.update(output[node])
+
+            topic_matches = set()
+            keyword_matches = dict(self._always)
+            for term_id in found:
+                for topic_id, is_topic, multiplicity in postings[term_id]:
+                    if is_topic:
+                        topic_matches.add(topic_id)
+                    else:
+                        keyword_matches[topic_id] = keyword_matches.get(topic_id, 0) + multiplicity
+
+            candidates = topic_matches | set(keyword_matches)
+            return [(self._topics[topic_id], topic_id in topic_matches, keyword_matches.get(topic_id, 0))
+                    for topic_id in sorted(candidates)]
+
+    def _post(self, term, topic_id, is_topic):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._postings)
+            self._term_ids[term] = term_id
+            self._postings.append([])
+        # A keyword listed twice for a topic has always counted twice
+        for posting in self._postings[term_id]:
+            if posting[0] == topic_id and posting[1] == is_topic:
+                posting[2] += 1
+                return
+        self._postings[term_id].append([topic_id, is_topic, 1])
+
+    def _unindex(self, topic_id):
+        for postings in self._postings:
+            postings[:] = [p for p in postings if p[0] != topic_id]
+        self._always.pop(topic_id, None)
+
+    def _build(self):
+        """Rebuild the trie, failure links and output sets for every indexed term"""
+        goto, output = [{}], [[]]
+        for term, term_id in self._term_ids.items():
+            if not self._postings[term_id]:
+                continue
+            node = 0
+            for char in term:
+                next_node = goto[node].get(char)
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][char] = next_node
+                    goto.append({})
+                    output.append([])
+                node = next_node
+            output[node].append(term_id)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                if output[fail[child]]:
+                    output[child] = output[child] + output[fail[child]]
+
+        self._goto, self._fail, self._output = goto, fail, output
+        self._dirty = False
@@ -0,0 +1,205 @@
+# feed_ingestion.py - Background RSS ingestion with conditional requests
+
+import logging
+import threading
+from datetime import datetime
+
+import feedparser
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_SECONDS = 300
+MAX_ENTRIES_PER_FEED = 50
+FIRST_REFRESH_WAIT_SECONDS = 10
+MAX_FEED_BYTES = 5 * 1024 * 1024
+
+
+class FeedIngestor:
+    """Refreshes every news feed on a schedule and hands changed entries to its listeners.
+
+    All feeds are fetched concurrently through the shared ArticleFetcher, with
+    If-None-Match / If-Modified-Since, so an unchanged feed costs one 304 and no parsing.
+    Listeners (the analyzer's NewsIndex) keep the entries; claim searches read that
+    index and never touch the network.
+    """
+
+    def __init__(self, feeds, fetcher, refresh_interval=REFRESH_INTERVAL_SECONDS,
+                 max_entries_per_feed=MAX_ENTRIES_PER_FEED):
+        self.feeds = dict(feeds)
+        self.fetcher = fetcher
+        self.refresh_interval = refresh_interval
+        self.max_entries_per_feed = max_entries_per_feed
+
+        self._lock = threading.Lock()
+        self._entry_counts = {source: 0 for source in self.feeds}
+        self._validators = {source: {} for source in self.feeds}
+        self._feed_status = {source: {'status': 'pending'} for source in self.feeds}
+        self._listeners = []
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_listener(self, callback):
+        """callback(source, entries) runs after a feed delivers new entries"""
+        self._listeners.append(callback)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="feed-ingestor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception:
+                # Keep the thread alive: the next interval tries again
+                logger.exception("Feed refresh failed")
+            self._stop.wait(self.refresh_interval)
+
+    def wait_until_ready(self, timeout=FIRST_REFRESH_WAIT_SECONDS):
+        """Block until the first refresh has finished (or the timeout passes)"""
+        return self._ready.wait(timeout)
+
+    def refresh(self):
+        """Fetch every feed concurrently and replace the entries of the ones that changed"""
+        try:
+            sources = list(self.feeds)
+            headers = []
+            for source in sources:
+                validators = self._validators[source]
+                conditional = {}
+                if validators.get('etag'):
+                    conditional['If-None-Match'] = validators['etag']
+                if validators.get('last_modified'):
+                    conditional['If-Modified-Since'] = validators['last_modified']
+                headers.append(conditional)
+
+            responses = self.fetcher.fetch_many([self.feeds[s] for s in sources], headers=headers,
+                                                max_bytes=MAX_FEED_BYTES)
+            refreshed_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            for source, response in zip(sources, responses):
+                try:
+                    self._apply(source, response, refreshed_at)
+                except Exception as e:
+                    # One malformed feed must not keep the others from updating
+                    logger.exception("Failed to parse feed", extra={'feed': source})
+                    with self._lock:
+                        self._feed_status[source] = {'status': 'error', 'error': str(e),
+                                                     'checked_at': refreshed_at}
+        finally:
+            # Even a failed first refresh must not leave searches waiting for it
+            self._ready.set()
+
+    def _apply(self, source, response, refreshed_at):
+        """Record one feed's response and hand new entries to the listeners"""
+        if isinstance(response, Exception):
+            logger.warning("Failed to refresh feed: %s", response, extra={'feed': source})
+            with self._lock:
+                self._feed_status[source] = {'status': 'error', 'error': str(response),
+                                             'checked_at': refreshed_at}
+            return
+
+        if response['status_code'] == 304:
+            with self._lock:
+                self._feed_status[source] = dict(self._feed_status[source], status='not_modified',
+                                                 checked_at=refreshed_at)
+            return
+
+        feed = feedparser.parse(response['content'], response_headers=response['headers'])
+        entries = [self._normalize_entry(entry) for entry in feed.entries[:self.max_entries_per_feed]]
+
+        with self._lock:
+            self._entry_counts[source] = len(entries)
+            self._validators[source] = {
+                'etag': response['headers'].get('etag'),
+                'last_modified': response['headers'].get('last-modified'),
+            }
+            self._feed_status[source] = {'status': 'updated', 'entries': len(entries),
+                                         'checked_at': refreshed_at, 'updated_at': refreshed_at}
+
+        for listener in self._listeners:
+            try:
+                listener(source, entries)
+            except Exception:
+                logger.exception("Feed listener failed", extra={'feed': source})
+
+    def _normalize_entry(self, entry):
+        return {
+            'title': entry.get('title', ''),
+            'summary': entry.get('summary', ''),
+            'link': entry.get('link', ''),
+            'published': entry.get('published', 'Unknown'),
+            'published_parsed': entry.get('published_parsed'),
+        }
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                'ready': self._ready.is_set(),
+                'refresh_interval_seconds': self.refresh_interval,
+                'entries': sum(self._entry_counts.values()),
+                'feeds': {source: dict(status) for source, status in self._feed_status.items()},
+            }
+
+
+# Exercise conditional refreshes against a local stub feed server
+if __name__ == "__main__":
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from article_fetcher import ArticleFetcher
+
+    RSS = (b'<?xml version="1.0"?><rss version="2.0"><channel><title>Stub</title>'
+           b'<item><title>Vaccine trial results published</title><link>http://stub/1</link>'
+           b'<description>Researchers report phase 3 results</description></item>'
+           b'<item><title>Election turnout hits record</title><link>http://stub/2</link>'
+           b'<description>Officials confirm final numbers</description></item>'
+           b'</channel></rss>')
+
+    class StubFeedHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+        hits = {'200': 0, '304': 0}
+
+        def do_GET(self):
+            if self.headers.get('If-None-Match') == '"v1"':
+                StubFeedHandler.hits['304'] += 1
+                self.send_response(304)
+                self.send_header('ETag', '"v1"')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            StubFeedHandler.hits['200'] += 1
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/rss+xml')
+            self.send_header('ETag', '"v1"')
+            self.send_header('Content-Length', str(len(RSS)))
+            self.end_headers()
+            self.wfile.write(RSS)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubFeedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    print("🚀 Testing FeedIngestor against a local stub feed server")
+    print("="*60)
+
+    fetcher = ArticleFetcher()
+    ingestor = FeedIngestor({f"feed{i}": f"{base}/feed/{i}" for i in range(5)}, fetcher)
+
+    ingestor.refresh()
+    print(f"\n📰 First refresh:  {ingestor.get_stats()['entries']} entries, responses {StubFeedHandler.hits}")
+    ingestor.refresh()
+    print(f"🔁 Second refresh: {ingestor.get_stats()['entries']} entries, responses {StubFeedHandler.hits}")
+    print(f"   feed0 status: {ingestor.get_stats()['feeds']['feed0']['status']}")
+
+    fetcher.close()
+    server.shutdown()
+    print("\n🎉 Feed ingestion test complete!")
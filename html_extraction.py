@@ -0,0 +1,275 @@
+# html_extraction.py - Pluggable article extraction: streaming lxml with density scoring, or the BeautifulSoup original
+
+import os
+import re
+
+# Chosen with the HTML_EXTRACTOR environment variable
+EXTRACTORS = ('lxml', 'bs4')
+DEFAULT_EXTRACTOR = 'lxml'
+
+# Removed with everything inside them before any text is measured
+BOILERPLATE_TAGS = frozenset({'script', 'style', 'nav', 'footer', 'aside', 'header', 'noscript', 'template'})
+# Paragraph-like elements whose text scores the container they sit in
+PARAGRAPH_TAGS = frozenset({'p', 'pre', 'blockquote'})
+
+MIN_ARTICLE_CHARS = 200         # shorter picks fall back to the whole page, as before
+MIN_PARAGRAPH_CHARS = 25        # shorter paragraphs (bylines, captions, "Share") score nothing
+FEED_CHUNK_BYTES = 32 * 1024
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([A-Za-z0-9_.:-]+)', re.I)
+_HEADER_CHARSET = re.compile(r'charset\s*=\s*["\']?([A-Za-z0-9_.:-]+)', re.I)
+
+
+def configured_extractor():
+    name = os.environ.get('HTML_EXTRACTOR', DEFAULT_EXTRACTOR).strip().lower()
+    if name not in EXTRACTORS:
+        raise ValueError(f"HTML_EXTRACTOR must be one of {', '.join(EXTRACTORS)}, got '{name}'")
+    return name
+
+
+def build_extractor(name=None):
+    """An extractor whose extract(content, content_type, max_chars) returns {'text', 'title', 'method', ...}.
+
+    method says how the text was found: 'article', 'density' / 'selector', or 'page'
+    when nothing better than the whole page's text was found. canonical_url is the
+    href of the page's <link rel="canonical">, as written (possibly relative), or None.
+    """
+    name = name or configured_extractor()
+    if name == 'lxml':
+        return LxmlExtractor()
+    if name == 'bs4':
+        return BeautifulSoupExtractor()
+    raise ValueError(f"Unknown HTML extractor '{name}'")
+
+
+def _normalize(pieces):
+    return ' '.join(' '.join(pieces).split())
+
+
+def sniff_encoding(content, content_type=None):
+    """Charset from the Content-Type header, else a <meta> tag near the top, else UTF-8 if it decodes"""
+    if content_type:
+        match = _HEADER_CHARSET.search(content_type)
+        if match:
+            return match.group(1)
+    match = _META_CHARSET.search(content[:4096])
+    if match:
+        return match.group(1).decode('ascii')
+    try:
+        content.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        # What browsers assume for undeclared legacy pages
+        return 'windows-1252'
+
+
+class BeautifulSoupExtractor:
+    """The original extractor: html.parser, then <article>, then content selectors, then the whole page"""
+
+    name = 'bs4'
+
+    def __init__(self):
+        from bs4 import BeautifulSoup
+        self._soup = BeautifulSoup
+
+    def extract(self, content, content_type=None, max_chars=None):
+        soup = self._soup(content, 'html.parser')
+
+        # Remove unwanted elements
+        for element in soup(['script', 'style', 'nav', 'footer', 'aside', 'header']):
+            element.decompose()
+
+        # Try to find main content
+        method = 'article'
+        article_text = None
+        article = soup.find('article')
+        if article:
+            article_text = article.get_text(separator=' ', strip=True)
+
+        if not article_text:
+            method = 'selector'
+            content_selectors = ['div[class*="content"]', 'div[class*="article"]', 'main']
+            for selector in content_selectors:
+                content_div = soup.select_one(selector)
+                if content_div:
+                    article_text = content_div.get_text(separator=' ', strip=True)
+                    if len(article_text) > MIN_ARTICLE_CHARS:
+                        break
+
+        if not article_text or len(article_text) < MIN_ARTICLE_CHARS:
+            method = 'page'
+            article_text = soup.get_text(separator=' ', strip=True)
+
+        title_tag = soup.find('title')
+        canonical_tag = soup.find('link', rel='canonical', href=True)
+        return {
+            'text': ' '.join(article_text.split()),
+            'title': title_tag.get_text().strip() if title_tag else None,
+            'method': method,
+            'canonical_url': canonical_tag['href'] if canonical_tag else None,
+        }
+
+
+class LxmlExtractor:
+    """Single streaming pass over the page with libxml2's HTML parser.
+
+    The page is fed in chunks and handled element by element as each one closes:
+    boilerplate subtrees are cleared on the spot, and every paragraph adds to the
+    score of its parent (and half to its grandparent), Readability-style. The first
+    <article> with enough text wins outright, as it did before; otherwise the
+    container with the best link-density-adjusted score does, and only if neither
+    has MIN_ARTICLE_CHARS of text does the whole page's text stand in.
+
+    Reading stops early once that <article> closes, or once one container holds
+    max_chars of paragraph text, since the caller keeps no more than that.
+    """
+
+    name = 'lxml'
+
+    def __init__(self):
+        # Imported here so a missing lxml fails at start-up, not on the first page
+        from lxml import etree
+        self._etree = etree
+
+    def extract(self, content, content_type=None, max_chars=None):
+        parser = self._etree.HTMLPullParser(events=('end',), encoding=sniff_encoding(content, content_type),
+                                            remove_comments=True, remove_pis=True)
+        title = canonical = None
+        scores = {}                 # container -> paragraph score
+        paragraph_chars = {}        # container -> characters of scored paragraph text
+        picked = None
+
+        for offset in range(0, len(content), FEED_CHUNK_BYTES):
+            parser.feed(content[offset:offset + FEED_CHUNK_BYTES])
+            for _, element in parser.read_events():
+                tag = element.tag
+                if not isinstance(tag, str):
+                    continue
+                if tag in BOILERPLATE_TAGS:
+                    element.clear(keep_tail=True)
+                elif tag == 'title' and title is None:
+                    title = ''.join(element.itertext()).strip()
+                elif tag == 'link' and canonical is None and element.get('href') and \
+                        'canonical' in element.get('rel', '').lower().split():
+                    canonical = element.get('href')
+                elif tag == 'article':
+                    text = _normalize(element.itertext())
+                    if len(text) >= MIN_ARTICLE_CHARS:
+                        picked = (text, 'article')
+                        break
+                elif tag in PARAGRAPH_TAGS:
+                    self._score_paragraph(element, scores, paragraph_chars)
+                    parent = element.getparent()
+                    if max_chars and paragraph_chars.get(parent, 0) >= max_chars:
+                        picked = (_normalize(parent.itertext()), 'density')
+                        break
+            if picked:
+                break
+
+        stopped_early = picked is not None
+        if picked is None:
+            try:
+                root = parser.close()
+            except self._etree.XMLSyntaxError:
+                root = None     # nothing parseable, e.g. an empty body
+            picked = self._best_candidate(root, scores)
+
+        text, method = picked
+        return {'text': text, 'title': title, 'method': method, 'stopped_early': stopped_early,
+                'canonical_url': canonical}
+
+    def _score_paragraph(self, paragraph, scores, paragraph_chars):
+        text = _normalize(paragraph.itertext())
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            return
+        # Paragraphs left inside boilerplate (a <p> in an <aside>) are cleared with it later
+        if any(ancestor.tag in BOILERPLATE_TAGS for ancestor in paragraph.iterancestors()):
+            return
+        score = 1 + text.count(',') + min(len(text) // 100, 3)
+        parent = paragraph.getparent()
+        if parent is None:
+            return
+        scores[parent] = scores.get(parent, 0) + score
+        paragraph_chars[parent] = paragraph_chars.get(parent, 0) + len(text)
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0) + score / 2
+
+    def _best_candidate(self, root, scores):
+        if root is None:
+            return '', 'page'
+        best, best_score = None, 0
+        for candidate, score in scores.items():
+            if candidate.tag in ('html', 'body'):
+                continue
+            text_chars = sum(len(piece) for piece in candidate.itertext())
+            link_chars = sum(len(piece) for link in candidate.iter('a') for piece in link.itertext())
+            score *= 1 - link_chars / max(text_chars, 1)
+            if score > best_score:
+                best, best_score = candidate, score
+        if best is not None:
+            text = _normalize(best.itertext())
+            if len(text) >= MIN_ARTICLE_CHARS:
+                return text, 'density'
+        return _normalize(root.itertext()), 'page'
+
+
+# Parity check against the BeautifulSoup extractor and a per-page benchmark
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import time
+
+    parser = argparse.ArgumentParser(description="Compare the lxml extractor with the BeautifulSoup original")
+    parser.add_argument('--pages', nargs='*', help="HTML files (default: the benchmark fixtures)")
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--max-chars', type=int, default=60000)
+    parser.add_argument('--min-overlap', type=float, default=0.9, help="word-set overlap required for parity")
+    args = parser.parse_args()
+
+    print("🚀 Article extraction parity check and benchmark")
+    print("="*60)
+
+    fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_fixtures')
+    paths = args.pages or sorted(glob.glob(os.path.join(fixtures, 'pages', '*.html')) +
+                                 glob.glob(os.path.join(fixtures, 'extraction', '*.html')))
+    corpus = [(os.path.basename(path), open(path, 'rb').read()) for path in paths]
+
+    # A 2 MB page (the fetcher's cap) where the article alone is far longer than max_chars
+    with open(os.path.join(fixtures, 'pages', 'long-credible.html'), 'rb') as f:
+        page = f.read()
+    body_start, body_end = page.index(b'<p>'), page.index(b'</div>\n</main>')
+    paragraphs = page[body_start:body_end]
+    repeats = (2 * 1024 * 1024 - len(page)) // len(paragraphs)
+    corpus.append(('huge-article (2 MB)', page[:body_start] + paragraphs * repeats + page[body_end:]))
+
+    legacy, streaming = build_extractor('bs4'), build_extractor('lxml')
+
+    def timed(extractor, content):
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            result = extractor.extract(content, max_chars=args.max_chars)
+        return result, (time.perf_counter() - start) / args.rounds * 1000
+
+    failed = False
+    totals = [0.0, 0.0]
+    print(f"\n{'page':<28} {'bs4 ms':>8} {'lxml ms':>8} {'speedup':>8} {'overlap':>8}  method")
+    for name, content in corpus:
+        old, old_ms = timed(legacy, content)
+        new, new_ms = timed(streaming, content)
+        totals[0] += old_ms
+        totals[1] += new_ms
+        # Compare what the caller keeps: at most max_chars of text
+        old_words = set(old['text'][:args.max_chars].split())
+        new_words = set(new['text'][:args.max_chars].split())
+        overlap = len(old_words & new_words) / max(len(old_words | new_words), 1)
+        within = overlap >= args.min_overlap and old['title'] == new['title']
+        failed = failed or not within
+        print(f"{name:<28} {old_ms:>8.2f} {new_ms:>8.2f} {old_ms / new_ms:>7.1f}x {overlap:>8.3f}  "
+              f"{old['method']} -> {new['method']}{' (stopped early)' if new['stopped_early'] else ''} "
+              f"{'✅' if within else '❌'}")
+    print(f"{'total':<28} {totals[0]:>8.2f} {totals[1]:>8.2f} {totals[0] / totals[1]:>7.1f}x")
+
+    if failed:
+        raise SystemExit(f"\n❌ Extracted text overlap fell below {args.min_overlap} or a title differed")
+    print("\n🎉 lxml extraction matches the BeautifulSoup extractor!")
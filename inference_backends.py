@@ -0,0 +1,234 @@
+# inference_backends.py - Pluggable PyTorch / int8 / ONNX Runtime backends for the classifiers
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+from transformers import pipeline
+
+# Chosen with the INFERENCE_BACKEND environment variable
+BACKENDS = ('pytorch', 'quantized', 'onnx')
+DEFAULT_BACKEND = 'pytorch'
+
+# Exported ONNX graphs are written here once and reused on later start-ups; the default
+# is the user's cache directory, never the working tree
+ONNX_CACHE_DIR = os.environ.get('ONNX_CACHE_DIR') or os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'news-verification-ai', 'onnx')
+
+# The model pipeline("sentiment-analysis") picks when none is named; ONNX export needs a name
+DEFAULT_SENTIMENT_MODEL = "distilbert/distilbert-base-uncased-finetuned-sst-2-english"
+
+# Largest allowed fake_probability drift from the fp32 PyTorch reference
+PARITY_TOLERANCE = 0.05
+
+logger = logging.getLogger(__name__)
+
+
+def configured_backend():
+    backend = os.environ.get('INFERENCE_BACKEND', DEFAULT_BACKEND).strip().lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"INFERENCE_BACKEND must be one of {', '.join(BACKENDS)}, got '{backend}'")
+    return backend
+
+
+def build_pipeline(task, model=None, backend=None, onnx_cache_dir=None):
+    """A transformers pipeline for task/model running on the chosen backend.
+
+    Every backend returns a regular pipeline object, so callers (the micro-batchers,
+    the warm-up, analyze_text_content) don't know which one they are using.
+    onnx_cache_dir overrides ONNX_CACHE_DIR for the onnx backend.
+    """
+    backend = backend or configured_backend()
+    if backend == 'pytorch':
+        return pipeline(task, model=model)
+    if backend == 'quantized':
+        return _quantized_pipeline(task, model)
+    if backend == 'onnx':
+        return _onnx_pipeline(task, model, onnx_cache_dir or ONNX_CACHE_DIR)
+    raise ValueError(f"Unknown inference backend '{backend}'")
+
+
+def _quantized_pipeline(task, model):
+    """Dynamic int8 quantization: Linear weights stored as int8, activations quantized per batch"""
+    import torch
+
+    classifier = pipeline(task, model=model)
+    classifier.model = torch.ao.quantization.quantize_dynamic(
+        classifier.model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+    return classifier
+
+
+def _onnx_pipeline(task, model, cache_dir):
+    """Export the model to ONNX (first run only) and serve it through ONNX Runtime"""
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError:
+        raise ImportError("The onnx backend needs optimum[onnxruntime]: pip install 'optimum[onnxruntime]'")
+    from transformers import AutoTokenizer
+
+    model = model or (DEFAULT_SENTIMENT_MODEL if task == 'sentiment-analysis' else None)
+    if model is None:
+        raise ValueError("The onnx backend needs an explicit model name")
+
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', model)
+    export_dir = os.path.join(cache_dir, name)
+    if os.path.exists(os.path.join(export_dir, 'model.onnx')):
+        ort_model = ORTModelForSequenceClassification.from_pretrained(export_dir)
+        tokenizer = AutoTokenizer.from_pretrained(export_dir)
+    else:
+        logger.info("Exporting model to ONNX (one-time)", extra={'model': model, 'cache_dir': cache_dir})
+        ort_model = ORTModelForSequenceClassification.from_pretrained(model, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model)
+        _save_export(ort_model, tokenizer, cache_dir, name)
+
+    return pipeline(task, model=ort_model, tokenizer=tokenizer)
+
+
+def _save_export(ort_model, tokenizer, cache_dir, name):
+    """Write the export to a temporary directory, then rename it into place in one step.
+
+    A crash mid-write leaves only a hidden temporary directory, never a partial
+    export_dir that a later start-up would try to load. When another process
+    finished the same export first, its copy is kept.
+    """
+    export_dir = os.path.join(cache_dir, name)
+    staging = None
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{name}.", dir=cache_dir)
+        ort_model.save_pretrained(staging)
+        tokenizer.save_pretrained(staging)
+        if os.path.isdir(export_dir) and not os.path.exists(os.path.join(export_dir, 'model.onnx')):
+            # Left half-written by an export from before the rename was atomic
+            shutil.rmtree(export_dir, ignore_errors=True)
+        os.rename(staging, export_dir)
+    except OSError:
+        # Lost the race to another exporter (or the cache is not writable); serve
+        # the model from memory either way
+        logger.warning("Could not store the ONNX export", exc_info=True, extra={'cache_dir': cache_dir})
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+def fake_probability(prediction):
+    """The same mapping analyze_text_content applies to the classifier's output"""
+    return prediction['score'] if prediction['label'] == 'FAKE' else 1 - prediction['score']
+
+
+# Fixed corpus for the parity check: mixes the registers the service sees
+PARITY_CORPUS = [
+    "The city council approved the budget on Tuesday after a three-hour public hearing.",
+    "SHOCKING: Doctors HATE this one simple trick that cures everything overnight!!!",
+    "According to a peer-reviewed study published in Nature, average temperatures rose 1.1C.",
+    "BREAKING: Secret documents PROVE the election was stolen, share before they delete this!",
+    "Officials confirmed that the bridge will reopen next month once repairs are complete.",
+    "Scientists report new evidence that the vaccine reduces hospitalisation by 90 percent.",
+    "They don't want you to know the truth about what is really in the water supply.",
+    "The central bank held interest rates steady, citing moderating inflation data.",
+    "URGENT!!! Share now: the government is hiding the cure from the public.",
+    "Researchers at the university found no link between the supplement and weight loss.",
+    "Celebrity reveals miracle diet that melts 30 pounds in a week, experts stunned.",
+    "The ministry said in a statement that exports grew 4 percent in the third quarter.",
+]
+
+
+def _measure_backend(backend, fake_model, sentiment_model, rounds):
+    """Load one backend in a fresh process and report predictions, latency and memory"""
+    import resource
+    import statistics
+    import time
+
+    def rss_mb():
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+    base_rss = rss_mb()
+    started = time.perf_counter()
+    fake = build_pipeline("text-classification", model=fake_model, backend=backend)
+    sentiment = build_pipeline("sentiment-analysis", model=sentiment_model, backend=backend)
+    load_seconds = time.perf_counter() - started
+    loaded_rss = rss_mb()
+
+    # Warm up before timing, as the model registry does
+    fake(PARITY_CORPUS[:2], batch_size=2)
+    sentiment(PARITY_CORPUS[:2], batch_size=2)
+
+    single_ms = []
+    for _ in range(rounds):
+        for text in PARITY_CORPUS:
+            t0 = time.perf_counter()
+            fake(text)
+            sentiment(text)
+            single_ms.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fake(PARITY_CORPUS, batch_size=len(PARITY_CORPUS))
+        sentiment(PARITY_CORPUS, batch_size=len(PARITY_CORPUS))
+    batch_throughput = rounds * len(PARITY_CORPUS) / (time.perf_counter() - t0)
+
+    single_ms.sort()
+    return {
+        'probabilities': [fake_probability(p) for p in fake(PARITY_CORPUS, batch_size=len(PARITY_CORPUS))],
+        'load_seconds': load_seconds,
+        'p50_ms': statistics.median(single_ms),
+        'p95_ms': single_ms[int(len(single_ms) * 0.95) - 1],
+        'batch_texts_per_second': batch_throughput,
+        'model_rss_mb': loaded_rss - base_rss,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+# Parity check and latency/memory benchmark across backends
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+
+    parser = argparse.ArgumentParser(description="Compare inference backends against fp32 PyTorch")
+    parser.add_argument('--fake-model', default="hamzab/roberta-fake-news-classification")
+    parser.add_argument('--sentiment-model', default=DEFAULT_SENTIMENT_MODEL)
+    parser.add_argument('--backends', default=','.join(BACKENDS))
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=PARITY_TOLERANCE)
+    args = parser.parse_args()
+
+    print("🚀 Inference backend parity check and benchmark")
+    print("="*60)
+
+    backends = [b.strip() for b in args.backends.split(',') if b.strip()]
+    if 'pytorch' not in backends:
+        backends.insert(0, 'pytorch')
+
+    # A fresh process per backend, so memory figures don't include the other backends
+    context = multiprocessing.get_context('spawn')
+    reports = {}
+    for backend in backends:
+        with context.Pool(1) as pool:
+            try:
+                reports[backend] = pool.apply(_measure_backend,
+                                              (backend, args.fake_model, args.sentiment_model, args.rounds))
+            except Exception as e:
+                print(f"⚠️ {backend}: skipped ({e})")
+
+    if 'pytorch' not in reports:
+        raise SystemExit("❌ The PyTorch reference backend failed to load")
+
+    reference = reports['pytorch']['probabilities']
+    failed = False
+    print(f"\n{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'batch/s':>9} "
+          f"{'model MB':>9} {'peak MB':>8} {'max drift':>10}")
+    for backend, report in reports.items():
+        drift = max(abs(a - b) for a, b in zip(report['probabilities'], reference))
+        within = drift <= args.tolerance
+        failed = failed or not within
+        print(f"{backend:<10} {report['load_seconds']:>7.2f} {report['p50_ms']:>8.2f} {report['p95_ms']:>8.2f} "
+              f"{report['batch_texts_per_second']:>9.1f} {report['model_rss_mb']:>9.1f} "
+              f"{report['peak_rss_mb']:>8.1f} {drift:>10.4f} {'✅' if within else '❌'}")
+
+    if failed:
+        raise SystemExit(f"\n❌ fake_probability drifted more than {args.tolerance} from PyTorch")
+    print(f"\n🎉 All backends within {args.tolerance} of PyTorch!")
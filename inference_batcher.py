@@ -0,0 +1,102 @@
+# inference_batcher.py - Dynamic micro-batching for the transformer pipelines
+
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty
+
+class MicroBatcher:
+    """Collects texts from concurrent callers and runs them through a model as one padded batch"""
+
+    def __init__(self, batch_fn, name="model", max_batch_size=16, max_wait_ms=10):
+        # batch_fn takes a list of texts and returns one result per text, in order
+        self.batch_fn = batch_fn
+        self.name = name
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+
+        self._queue = Queue()
+        self._stats_lock = threading.Lock()
+        self.stats = {'batches': 0, 'items': 0, 'largest_batch': 0}
+
+        self._worker = threading.Thread(target=self._run, name=f"{name}-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        """Queue one text and return a Future for its result"""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def predict(self, text, timeout=None):
+        """Blocking helper: run one text through the next batch"""
+        return self.submit(text).result(timeout=timeout)
+
+    def predict_many(self, texts, timeout=None):
+        """Queue several texts at once so they share batches with everyone else"""
+        futures = [self.submit(text) for text in texts]
+        return [future.result(timeout=timeout) for future in futures]
+
+    def close(self):
+        """Stop the worker once the queued texts have been processed"""
+        self._queue.put(None)
+        self._worker.join()
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['average_batch'] = round(stats['items'] / stats['batches'], 2) if stats['batches'] else 0
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+
+            # Keep collecting until the batch is full or the oldest text has waited max_wait
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._process(batch)
+            if stop:
+                return
+
+    def _process(self, batch):
+        batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        with self._stats_lock:
+            self.stats['batches'] += 1
+            self.stats['items'] += len(batch)
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+
+        try:
+            results = self.batch_fn([text for text, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # One bad input must not fail everyone else's request: retry individually
+            for text, future in batch:
+                try:
+                    future.set_result(self.batch_fn([text])[0])
+                except Exception as single_error:
+                    future.set_exception(single_error)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
@@ -0,0 +1,287 @@
+# job_queue.py - Persistent SQLite job queue with a local worker pool, retries and a job TTL
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+import sqlite3
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# The temp dir is the one writable place on read-only deployments such as Vercel
+JOB_QUEUE_DB = os.environ.get('JOB_QUEUE_DB', os.path.join(tempfile.gettempdir(), 'analysis_jobs.db'))
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF_SECONDS = 2       # doubled after every failed attempt
+JOB_LEASE_SECONDS = 300             # a running job not finished by then is assumed lost and re-run
+JOB_TTL_SECONDS = 3600              # finished and unclaimed jobs are deleted after this long
+MAX_QUEUED_JOBS = 10_000
+PURGE_INTERVAL_SECONDS = 60
+
+
+class JobQueueFull(Exception):
+    """More than MAX_QUEUED_JOBS jobs are waiting; the caller should retry later"""
+
+
+class JobQueue:
+    """Analyses queued in SQLite and drained by a local pool of worker threads.
+
+    A submitted job gets an ID straight away and is stored before any work starts, so
+    queued jobs survive a restart and a job whose worker died is picked up again once
+    its lease expires. Handlers that raise are retried with exponential backoff up to
+    max_attempts; a handler that returns {'error': ...} has failed for good (a bad
+    input, not a transient fault). Every job is deleted ttl_seconds after submission.
+    """
+
+    def __init__(self, handlers, path=JOB_QUEUE_DB, workers=JOB_WORKERS, max_attempts=JOB_MAX_ATTEMPTS,
+                 ttl_seconds=JOB_TTL_SECONDS, lease_seconds=JOB_LEASE_SECONDS, max_queued=MAX_QUEUED_JOBS):
+        self.handlers = dict(handlers)
+        self.workers = max(1, workers)
+        self.max_attempts = max_attempts
+        self.ttl_seconds = ttl_seconds
+        self.lease_seconds = lease_seconds
+        self.max_queued = max_queued
+
+        self._lock = threading.Lock()
+        self._work_available = threading.Condition()
+        self._finished = threading.Condition()
+        self._async_waiters = {}    # job id -> [(loop, asyncio.Future)]
+        self._threads = []
+        self._stopping = threading.Event()
+        self._last_purge = 0.0
+        self.stats = {'submitted': 0, 'completed': 0, 'failed': 0, 'retried': 0, 'purged': 0}
+
+        # Autocommit mode: claims use explicit BEGIN IMMEDIATE so several processes can share the file
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                run_after REAL NOT NULL,
+                lease_until REAL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_runnable ON jobs(status, run_after);
+            CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs(expires_at);
+        """)
+
+    def start(self):
+        """Start the worker threads; returns immediately"""
+        if self._threads:
+            return self
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, kind, payload):
+        """Store a job and wake a worker; returns the job dict. Raises JobQueueFull or ValueError"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job type '{kind}'")
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            queued = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"{queued} jobs are already queued, try again shortly")
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at, run_after, expires_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now, now, now + self.ttl_seconds)
+            )
+            self.stats['submitted'] += 1
+        with self._work_available:
+            self._work_available.notify()
+        return self.get(job_id)
+
+    async def submit_async(self, kind, payload):
+        """submit() for the event loop.
+
+        Every SQLite call may wait on self._lock (held by workers claiming jobs) and on
+        busy_timeout when other processes share the file, so none of them run on the loop.
+        """
+        return await asyncio.to_thread(self.submit, kind, payload)
+
+    async def get_async(self, job_id):
+        """get() for the event loop, run on a thread like submit_async"""
+        return await asyncio.to_thread(self.get, job_id)
+
+    def get(self, job_id):
+        """The job as a dict, or None if it never existed or has expired"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, attempts, result, error, created_at, updated_at, expires_at "
+                "FROM jobs WHERE id = ? AND expires_at > ?", (job_id, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, status, attempts, result, error, created_at, updated_at, expires_at = row
+        job = {
+            'job_id': job_id,
+            'type': kind,
+            'status': status,
+            'attempts': attempts,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'expires_at': expires_at,
+        }
+        if result is not None:
+            job['result'] = json.loads(result)
+        if error is not None:
+            job['error'] = error
+        return job
+
+    def wait(self, job_id, timeout):
+        """Block until the job has finished (or timeout passes); returns get(job_id)"""
+        deadline = time.monotonic() + timeout
+        with self._finished:
+            while True:
+                job = self.get(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job['status'] in ('done', 'failed') or remaining <= 0:
+                    return job
+                # Finishing jobs notify; the cap also covers jobs finished by another process
+                self._finished.wait(min(remaining, 1.0))
+
+    async def wait_async(self, job_id, timeout):
+        """Long-poll without holding a thread: resolves when the job finishes or timeout passes"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            finished = loop.create_future()
+            with self._lock:
+                self._async_waiters.setdefault(job_id, []).append((loop, finished))
+            job = await self.get_async(job_id)
+            remaining = deadline - loop.time()
+            if job is None or job['status'] in ('done', 'failed') or remaining <= 0:
+                self._discard_waiter(job_id, finished)
+                return job
+            try:
+                await asyncio.wait_for(finished, timeout=min(remaining, 1.0))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._discard_waiter(job_id, finished)
+
+    def _discard_waiter(self, job_id, future):
+        with self._lock:
+            waiters = self._async_waiters.get(job_id, [])
+            waiters[:] = [w for w in waiters if w[1] is not future]
+            if not waiters:
+                self._async_waiters.pop(job_id, None)
+
+    def _claim(self):
+        """Take the oldest runnable job (or one whose lease expired), or None"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, kind, payload, attempts FROM jobs "
+                    "WHERE (status = 'queued' AND run_after <= ?) OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1", (now, now)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?, "
+                        "updated_at = ? WHERE id = ?", (now + self.lease_seconds, now, row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def _work(self):
+        while not self._stopping.is_set():
+            self._purge_expired()
+            job = self._claim()
+            if job is None:
+                with self._work_available:
+                    # Woken by submit; the timeout picks up retries whose backoff has passed
+                    self._work_available.wait(1.0)
+                continue
+            self._run(*job)
+
+    def _run(self, job_id, kind, payload, attempts):
+        attempt = attempts + 1
+        try:
+            result = self.handlers[kind](json.loads(payload))
+        except Exception as e:
+            if attempt < self.max_attempts:
+                delay = JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1)
+                logger.warning("Job attempt failed, retrying: %s", e,
+                               extra={'job_id': job_id, 'job_type': kind, 'attempt': attempt, 'retry_in': delay})
+                self._update(job_id, status='queued', error=str(e), run_after=time.time() + delay)
+                with self._lock:
+                    self.stats['retried'] += 1
+                return
+            logger.error("Job failed after %d attempts: %s", attempt, e, extra={'job_id': job_id, 'job_type': kind})
+            self._finish(job_id, status='failed', error=str(e))
+            return
+
+        if isinstance(result, dict) and 'error' in result:
+            self._finish(job_id, status='failed', error=str(result['error']))
+        else:
+            self._finish(job_id, status='done', result=json.dumps(result, default=str))
+
+    def _update(self, job_id, **columns):
+        columns['updated_at'] = time.time()
+        assignments = ', '.join(f"{name} = ?" for name in columns)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+
+    def _finish(self, job_id, status, result=None, error=None):
+        self._update(job_id, status=status, result=result, error=error, lease_until=None)
+        with self._lock:
+            self.stats['completed' if status == 'done' else 'failed'] += 1
+            waiters = self._async_waiters.pop(job_id, [])
+        with self._finished:
+            self._finished.notify_all()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+    def _purge_expired(self):
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        with self._lock:
+            purged = self._conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (now,)).rowcount
+            self.stats['purged'] += purged
+
+    async def get_stats_async(self):
+        return await asyncio.to_thread(self.get_stats)
+
+    def get_stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            stats = dict(self.stats)
+        stats['workers'] = self.workers
+        stats['jobs'] = {status: counts.get(status, 0) for status in ('queued', 'running', 'done', 'failed')}
+        return stats
+
+    def shutdown(self, timeout=5):
+        """Stop the workers; jobs still running are re-run after their lease on the next start"""
+        self._stopping.set()
+        with self._work_available:
+            self._work_available.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        with self._lock:
+            self._conn.close()
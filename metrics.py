@@ -0,0 +1,215 @@
+# metrics.py - Per-stage timing spans, Prometheus text exposition and per-request timings
+
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+METRIC_PREFIX = 'news_ai'
+
+# Seconds; spans range from sub-millisecond index queries to multi-second fetches and OCR
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The timings dict of the request being served, or None when nobody asked for timings
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+_timings_lock = threading.Lock()
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            for key, value in items:
+                lines.extend(self._render_series(dict(zip(self.labelnames, key)), value))
+        return lines
+
+    def _render_series(self, labels, value):
+        return [f"{self.name}{_format_labels(labels)} {_format_value(value)}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def _render_series(self, labels, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, series['counts']):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+        lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {series['count']}")
+        lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+        lines.append(f"{self.name}_count{_format_labels(labels)} {series['count']}")
+        return lines
+
+
+STAGE_DURATION = Histogram('stage_duration_seconds', "Time spent in each analysis stage", ('stage',))
+STAGE_CALLS = Counter('stage_calls_total', "Analysis stage calls by outcome", ('stage', 'outcome'))
+STAGE_IN_FLIGHT = Gauge('stage_in_flight', "Analysis stage calls currently running", ('stage',))
+
+HTTP_DURATION = Histogram('http_request_duration_seconds', "HTTP request latency", ('method', 'route', 'status'))
+HTTP_IN_FLIGHT = Gauge('http_requests_in_flight', "HTTP requests currently being served")
+
+_METRICS = [STAGE_DURATION, STAGE_CALLS, STAGE_IN_FLIGHT, HTTP_DURATION, HTTP_IN_FLIGHT]
+_collectors = []
+
+
+def register_collector(collect):
+    """collect() returns [(name, kind, help, [(labels dict, value)])], read at scrape time.
+
+    For numbers other components already keep (executor queues, cache hit counts),
+    so they are exported without being counted twice.
+    """
+    _collectors.append(collect)
+
+
+def _add_timing(timings, stage, seconds):
+    with _timings_lock:
+        entry = timings.setdefault(stage, {'calls': 0, 'ms': 0.0})
+        entry['calls'] += 1
+        entry['ms'] = round(entry['ms'] + seconds * 1000, 3)
+
+
+def record(stage, seconds, outcome='ok'):
+    """Record a duration measured elsewhere (a worker process, a batch) as a stage span"""
+    STAGE_DURATION.observe(seconds, stage=stage)
+    STAGE_CALLS.inc(stage=stage, outcome=outcome)
+    timings = _request_timings.get()
+    if timings is not None:
+        _add_timing(timings, stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block as one call of stage"""
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        STAGE_IN_FLIGHT.dec(stage=stage)
+        record(stage, time.perf_counter() - started, outcome)
+
+
+def traced(stage):
+    """Decorator form of span(stage)"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_request_timings():
+    """Collect the spans of the current request (and of threads it hands work to) into a dict"""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def current_timings():
+    return _request_timings.get()
+
+
+def in_current_context(fn):
+    """Wrap fn so it runs in a copy of the caller's context on another thread.
+
+    Thread pools don't carry contextvars over, so without this the spans of work
+    handed to a pool wouldn't reach the request's timings.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time; pool.map runs this on several
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def render_metrics():
+    """Every metric in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            lines.append(f"# collector failed: {e}")
+            continue
+        for name, kind, help_text, samples in families:
+            name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
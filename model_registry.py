@@ -0,0 +1,115 @@
+# model_registry.py - Background, parallel model loading with warm-up and readiness tracking
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+
+logger = logging.getLogger(__name__)
+
+
+class ModelNotReady(Exception):
+    """Raised when a model is still loading after the caller's timeout, or failed to load"""
+
+    def __init__(self, name, state, error=None):
+        self.name = name
+        self.state = state
+        self.error = error
+        detail = f"Model '{name}' failed to load" if state == 'failed' else f"Model '{name}' is {state}"
+        super().__init__(f"{detail}: {error}" if error else detail)
+
+
+class ModelRegistry:
+    """Loads every model on its own thread at start-up and hands them out once warm.
+
+    Each loader builds a model, then its warm-up runs one inference so the first real
+    request doesn't pay for lazy initialisation (weights paging in, kernel selection,
+    the tesseract binary starting). Callers block (or await) with a timeout until the
+    models they need are ready instead of the whole process waiting for all of them.
+    """
+
+    def __init__(self, loaders, warmups=None, required=None):
+        self.loaders = dict(loaders)
+        self.warmups = dict(warmups or {})
+        # Readiness (/readyz) only waits on these; the rest are reported but optional
+        self.required = tuple(required) if required is not None else tuple(self.loaders)
+
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._status = {name: {'state': 'pending'} for name in self.loaders}
+
+    def start(self):
+        """Begin loading every model in parallel; returns immediately"""
+        if self._futures:
+            return self
+        pool = ThreadPoolExecutor(max_workers=len(self.loaders) or 1, thread_name_prefix="model-loader")
+        self._futures = {name: pool.submit(self._load, name) for name in self.loaders}
+        # The threads exit once their model is loaded; nothing else is ever submitted
+        pool.shutdown(wait=False)
+        return self
+
+    def _load(self, name):
+        self._set_status(name, state='loading')
+        started = time.perf_counter()
+        try:
+            model = self.loaders[name]()
+            loaded = time.perf_counter()
+            warmup = self.warmups.get(name)
+            if warmup is not None:
+                warmup(model)
+        except Exception as e:
+            logger.exception("Failed to load model", extra={'model': name})
+            self._set_status(name, state='failed', error=str(e),
+                             load_seconds=round(time.perf_counter() - started, 3))
+            raise
+
+        self._set_status(name, state='ready', load_seconds=round(loaded - started, 3),
+                         warmup_seconds=round(time.perf_counter() - loaded, 3))
+        logger.info("Model ready", extra={'model': name, 'seconds': round(time.perf_counter() - started, 1)})
+        return model
+
+    def _set_status(self, name, **status):
+        with self._lock:
+            self._status[name] = status
+
+    def get(self, name, timeout=None):
+        """Return the loaded model, waiting up to timeout seconds; raises ModelNotReady"""
+        future = self._futures.get(name)
+        if future is None:
+            raise ModelNotReady(name, 'not started' if name in self.loaders else 'unknown')
+        try:
+            return future.result(timeout=timeout)
+        except FuturesTimeout:
+            raise ModelNotReady(name, 'loading')
+        except Exception as e:
+            raise ModelNotReady(name, 'failed', e)
+
+    def wait_ready(self, names=None, timeout=None):
+        """Block until every named model is ready; raises ModelNotReady for the first that isn't"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for name in names if names is not None else self.required:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            self.get(name, timeout=remaining)
+
+    async def wait_ready_async(self, names=None, timeout=None):
+        """Await readiness without tying up a thread while the models load"""
+        names = tuple(names if names is not None else self.required)
+        pending = [self._futures[name] for name in names
+                   if name in self._futures and not self._futures[name].done()]
+        if pending:
+            # asyncio.wait leaves the loads running when the timeout expires
+            done, _ = await asyncio.wait([asyncio.wrap_future(future) for future in pending], timeout=timeout)
+            for waiter in done:
+                waiter.exception()  # reported through wait_ready below, not as "never retrieved"
+        self.wait_ready(names, timeout=0)
+
+    def is_ready(self, names=None):
+        names = names if names is not None else self.required
+        with self._lock:
+            return all(self._status.get(name, {}).get('state') == 'ready' for name in names)
+
+    def get_status(self):
+        with self._lock:
+            return {name: dict(status, required=name in self.required)
+                    for name, status in self._status.items()}
@@ -0,0 +1,208 @@
+# news_index.py - Embedded full-text index over ingested news articles
+
+import calendar
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+RETENTION_HOURS = 72          # matches the 3-day window NewsAPI is searched over
+PRUNE_INTERVAL_SECONDS = 60
+TITLE_WEIGHT = 3.0            # same title:summary ratio the old keyword loop used
+SUMMARY_WEIGHT = 1.0
+
+_QUERY_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def _published_timestamp(published, published_parsed=None):
+    """Epoch seconds for an RSS struct_time or a NewsAPI ISO-8601 string, else None"""
+    if published_parsed:
+        return float(calendar.timegm(published_parsed))
+    if published and published != 'Unknown':
+        try:
+            return datetime.fromisoformat(published.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            pass
+    return None
+
+
+class NewsIndex:
+    """SQLite FTS5 index of articles from every news source, ranked with BM25.
+
+    Articles are upserted by URL as they arrive, so a feed refresh or NewsAPI response
+    only costs the rows that changed, and anything older than the retention window is
+    pruned. Queries are prefix matches on each keyword, ORed together and ranked with
+    title matches weighted above summary matches.
+    """
+
+    def __init__(self, path=':memory:', retention_hours=RETENTION_HOURS):
+        self.retention_seconds = retention_hours * 3600
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self.stats = {'inserted': 0, 'updated': 0, 'pruned': 0, 'queries': 0}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                origin TEXT NOT NULL,
+                source TEXT NOT NULL,
+                title TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                published TEXT,
+                published_at REAL NOT NULL,
+                credibility_score INTEGER,
+                source_category TEXT
+            );
+            CREATE INDEX IF NOT EXISTS articles_published_at ON articles(published_at);
+            CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                title, summary, content='articles', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+        """)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def add_articles(self, articles, origin):
+        """Upsert article dicts with title, url, source, published, description/summary.
+
+        Optional keys: published_parsed, credibility_score, source_category.
+        """
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                for article in articles:
+                    url = article.get('url') or ''
+                    title = article.get('title') or ''
+                    if not url or not title:
+                        continue
+                    summary = article.get('summary', article.get('description')) or ''
+                    published_at = _published_timestamp(article.get('published'),
+                                                        article.get('published_parsed')) or now
+
+                    row = self._conn.execute("SELECT id, title, summary FROM articles WHERE url = ?",
+                                             (url,)).fetchone()
+                    if row is not None:
+                        # External-content FTS tables need the old text to remove a row
+                        self._conn.execute(
+                            "INSERT INTO articles_fts(articles_fts, rowid, title, summary) "
+                            "VALUES ('delete', ?, ?, ?)", row)
+                        self._conn.execute("DELETE FROM articles WHERE id = ?", (row[0],))
+                        self.stats['updated'] += 1
+                    else:
+                        self.stats['inserted'] += 1
+
+                    cursor = self._conn.execute(
+                        "INSERT INTO articles (url, origin, source, title, summary, published, published_at, "
+                        "credibility_score, source_category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (url, origin, article.get('source', ''), title, summary,
+                         article.get('published', 'Unknown'), published_at,
+                         article.get('credibility_score'), article.get('source_category')))
+                    self._conn.execute("INSERT INTO articles_fts(rowid, title, summary) VALUES (?, ?, ?)",
+                                       (cursor.lastrowid, title, summary))
+
+            if now - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+                self._prune(now)
+
+    def prune(self):
+        with self._lock:
+            return self._prune(time.time())
+
+    def _prune(self, now):
+        cutoff = now - self.retention_seconds
+        with self._conn:
+            expired = self._conn.execute("SELECT id, title, summary FROM articles WHERE published_at < ?",
+                                         (cutoff,)).fetchall()
+            self._conn.executemany(
+                "INSERT INTO articles_fts(articles_fts, rowid, title, summary) VALUES ('delete', ?, ?, ?)",
+                expired)
+            self._conn.execute("DELETE FROM articles WHERE published_at < ?", (cutoff,))
+        self._last_prune = now
+        self.stats['pruned'] += len(expired)
+        return len(expired)
+
+    def search(self, keywords, limit=10, since_hours=None):
+        """Top-k articles matching any keyword, best BM25 score first"""
+        terms = []
+        for keyword in keywords:
+            terms.extend(_QUERY_TERM.findall(keyword.lower()))
+        if not terms:
+            return []
+        match = ' OR '.join(f'"{term}"*' for term in dict.fromkeys(terms))
+
+        sql = ("SELECT a.url, a.origin, a.source, a.title, a.summary, a.published, a.credibility_score, "
+               "a.source_category, bm25(articles_fts, ?, ?) AS rank "
+               "FROM articles_fts JOIN articles a ON a.id = articles_fts.rowid "
+               "WHERE articles_fts MATCH ?")
+        params = [TITLE_WEIGHT, SUMMARY_WEIGHT, match]
+        if since_hours is not None:
+            sql += " AND a.published_at >= ?"
+            params.append(time.time() - since_hours * 3600)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            self.stats['queries'] += 1
+            rows = self._conn.execute(sql, params).fetchall()
+
+        columns = ('url', 'origin', 'source', 'title', 'summary', 'published', 'credibility_score',
+                   'source_category', 'bm25')
+        # SQLite's bm25() is negative, more negative meaning more relevant
+        return [dict(zip(columns, row[:-1] + (-row[-1],))) for row in rows]
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['articles'] = len(self)
+        stats['retention_hours'] = self.retention_seconds / 3600
+        return stats
+
+
+# Benchmark indexed search against rescanning raw entries
+if __name__ == "__main__":
+    import random
+
+    print("🚀 Benchmarking news index vs keyword loop")
+    print("="*60)
+
+    random.seed(5)
+    topics = ("election vaccine climate economy court senate market energy health border "
+              "police storm trade school science minister protest budget housing ceasefire").split()
+    filler = [''.join(random.choices('abcdefghijklmnopqrstuvwxyz', k=random.randint(4, 9))) for _ in range(8000)]
+    words = topics + filler
+    sources = ['reuters', 'bbc', 'ap', 'cnn', 'npr']
+    now = time.time()
+    articles = [{
+        'url': f"https://news.example/{i}",
+        'source': random.choice(sources).upper(),
+        'title': ' '.join(random.choices(words, k=8)),
+        'summary': ' '.join(random.choices(words, k=30)),
+        'published': datetime.fromtimestamp(now - random.uniform(0, 96 * 3600)).isoformat(),
+    } for i in range(20_000)]
+
+    index = NewsIndex()
+    start = time.perf_counter()
+    index.add_articles(articles, 'rss')
+    print(f"\n📚 Indexed {len(articles)} articles in {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{index.stats['pruned']} outside the {RETENTION_HOURS}h window pruned -> {len(index)} kept")
+
+    keywords = ['vaccine', 'senate', 'ceasefire']
+    runs = 200
+    start = time.perf_counter()
+    for _ in range(runs):
+        index.search(keywords, limit=10)
+    index_us = (time.perf_counter() - start) / runs * 1e6
+
+    lowered = [(a['title'].lower(), a['summary'].lower()) for a in articles]
+    start = time.perf_counter()
+    for _ in range(20):
+        scored = [sum(3 * (k in t) + (k in s) for k in keywords) for t, s in lowered]
+    loop_us = (time.perf_counter() - start) / 20 * 1e6
+
+    print(f"   Keyword loop: {loop_us:10.1f} µs per query")
+    print(f"   FTS5 top-10:  {index_us:10.1f} µs per query")
+    print(f"\n🎯 Top hit: {index.search(keywords, limit=1)[0]['title']}")
+    print("\n🎉 Benchmark complete!")
@@ -0,0 +1,278 @@
+# ocr_engine.py - Bounded process-pool OCR with image preprocessing and size limits
+
+import io
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+
+import pytesseract
+from PIL import Image, ImageOps
+
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', min(4, os.cpu_count() or 1)))
+OCR_MAX_PENDING = OCR_WORKERS * 2       # images queued or running before callers are turned away
+OCR_QUEUE_TIMEOUT = 10                  # seconds a caller waits for a free slot
+OCR_TIMEOUT_SECONDS = 15                # tesseract is killed after this long on one image
+
+MAX_IMAGE_PIXELS = 40_000_000           # decoded size limit, checked from the header before decoding
+OCR_MAX_PIXELS = 4_000_000              # images are downscaled to at most this many pixels for OCR
+
+# PIL itself refuses to open anything over twice this size as a decompression bomb
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+
+class OCRError(Exception):
+    """The image could not be read or OCR did not finish"""
+
+
+class ImageTooLarge(OCRError):
+    """Decoded pixel count is above MAX_IMAGE_PIXELS"""
+
+
+class OCRBusy(OCRError):
+    """Every OCR slot stayed taken for OCR_QUEUE_TIMEOUT seconds"""
+
+
+def _otsu_threshold(histogram):
+    """Grey level that best separates a 256-bin histogram into text and background"""
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    background, background_sum = 0, 0.0
+    best_threshold, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += level * count
+        mean_background = background_sum / background
+        mean_foreground = (weighted_total - background_sum) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+
+def preprocess_image(image, max_pixels=OCR_MAX_PIXELS):
+    """Downscale, grayscale and binarize an image for tesseract"""
+    image = ImageOps.exif_transpose(image)
+    if image.width * image.height > max_pixels:
+        scale = (max_pixels / (image.width * image.height)) ** 0.5
+        image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))),
+                             Image.LANCZOS)
+    image = ImageOps.autocontrast(image.convert('L'))
+    threshold = _otsu_threshold(image.histogram())
+    return image.point(lambda level: 255 if level > threshold else 0, mode='1')
+
+
+def ocr_image_bytes(image_bytes, max_image_pixels=MAX_IMAGE_PIXELS, max_ocr_pixels=OCR_MAX_PIXELS,
+                    timeout=OCR_TIMEOUT_SECONDS):
+    """Decode, preprocess and OCR one image; runs inside a pool worker process"""
+    started = time.perf_counter()
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        width, height = image.size
+    except Image.DecompressionBombError as e:
+        raise ImageTooLarge(str(e))
+    except Exception as e:
+        raise OCRError(f"Unsupported or corrupted image: {e}")
+    if width * height > max_image_pixels:
+        raise ImageTooLarge(f"Image is {width}x{height} ({width * height:,} pixels); "
+                            f"the limit is {max_image_pixels:,} pixels")
+
+    try:
+        prepared = preprocess_image(image, max_ocr_pixels)
+    except Exception as e:
+        raise OCRError(f"Could not decode image: {e}")
+    preprocessed = time.perf_counter()
+
+    try:
+        # pytesseract kills the tesseract process when the timeout expires
+        text = pytesseract.image_to_string(prepared, timeout=timeout)
+    except RuntimeError as e:
+        raise OCRError(f"OCR timed out after {timeout}s" if 'timeout' in str(e).lower() else str(e))
+
+    return {
+        'text': text,
+        'width': width,
+        'height': height,
+        'ocr_width': prepared.width,
+        'ocr_height': prepared.height,
+        'preprocess_ms': round((preprocessed - started) * 1000, 1),
+        'ocr_ms': round((time.perf_counter() - preprocessed) * 1000, 1),
+    }
+
+
+class OCREngine:
+    """Runs OCR in a bounded pool of worker processes, off the request threads.
+
+    Decoding and preprocessing happen in the worker too, so a huge upload costs a
+    worker process rather than memory in the API process, and a crashed worker
+    doesn't take the API down with it.
+    """
+
+    def __init__(self, workers=OCR_WORKERS, max_pending=OCR_MAX_PENDING, timeout=OCR_TIMEOUT_SECONDS,
+                 queue_timeout=OCR_QUEUE_TIMEOUT):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max(self.workers, max_pending))
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'images': 0, 'failed': 0, 'rejected': 0, 'ocr_seconds': 0.0}
+
+    def start(self):
+        """Start the worker processes now rather than on the first image.
+
+        Workers come from a forkserver (spawn where there is none), never from a fork
+        of the caller, whose other threads may hold locks at that moment; the pool is
+        also restarted by extract_text from a busy, multi-threaded process. The server
+        imports this module once, so each worker starts without re-importing PIL and
+        pytesseract. All workers are created on the first submit, so one no-op task
+        starts the pool.
+        """
+        self._get_pool().submit(os.getpid).result()
+        return self
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                if context.get_start_method() == 'forkserver':
+                    # ocr_image_bytes is all a worker runs; skip the default __main__ preload
+                    context.set_forkserver_preload(['ocr_engine'])
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            return self._pool
+
+    def extract_text(self, image_bytes):
+        """OCR one image; returns ocr_image_bytes' result dict or raises OCRError"""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._stats_lock:
+                self.stats['rejected'] += 1
+            raise OCRBusy(f"All {self.workers} OCR workers are busy, try again shortly")
+        started = time.perf_counter()
+        try:
+            future = self._get_pool().submit(ocr_image_bytes, image_bytes, timeout=self.timeout)
+            # Margin over tesseract's own timeout covers decoding and process start-up
+            result = future.result(timeout=self.timeout + 10)
+        except FuturesTimeout:
+            with self._stats_lock:
+                self.stats['failed'] += 1
+            raise OCRError(f"OCR timed out after {self.timeout}s")
+        except OCRError:
+            with self._stats_lock:
+                self.stats['failed'] += 1
+            raise
+        except Exception as e:
+            # A worker that died (out of memory, segfault) breaks the pool; start a fresh one
+            with self._stats_lock:
+                self.stats['failed'] += 1
+            self.shutdown()
+            raise OCRError(f"OCR worker failed: {e}")
+        finally:
+            self._slots.release()
+
+        with self._stats_lock:
+            self.stats['images'] += 1
+            self.stats['ocr_seconds'] += time.perf_counter() - started
+        return result
+
+    def warm_up(self):
+        """Start every worker process and run tesseract once in each"""
+        blank = io.BytesIO()
+        Image.new('L', (64, 32), color=255).save(blank, format='PNG')
+        futures = [self._get_pool().submit(ocr_image_bytes, blank.getvalue()) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['workers'] = self.workers
+        stats['average_seconds'] = round(stats['ocr_seconds'] / stats['images'], 3) if stats['images'] else 0
+        stats['ocr_seconds'] = round(stats['ocr_seconds'], 3)
+        return stats
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+def _synthetic_screenshot(width, height, seed):
+    """A screenshot-like image: dark text lines on a light background with a header bar"""
+    import random
+    from PIL import ImageDraw
+
+    rng = random.Random(seed)
+    image = Image.new('RGB', (width, height), (245, 245, 240))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([0, 0, width, max(40, height // 12)], fill=(30, 60, 120))
+    words = ("breaking officials confirmed report vaccine election climate study shows "
+             "share before deleted experts say according sources claim").split()
+    line_height = max(14, height // 40)
+    for y in range(max(40, height // 12) + line_height, height - line_height, line_height * 2):
+        draw.text((20, y), ' '.join(rng.choices(words, k=12)), fill=(20, 20, 20))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+# Measure OCR throughput on a local screenshot corpus
+if __name__ == "__main__":
+    import argparse
+    import glob
+    from concurrent.futures import ThreadPoolExecutor
+    # Imported by module name so worker processes unpickle the same exception classes
+    from ocr_engine import OCREngine, ImageTooLarge
+
+    parser = argparse.ArgumentParser(description="OCR throughput: process-pool engine vs in-thread full resolution")
+    parser.add_argument('--corpus', help="directory of screenshots (default: generate synthetic ones)")
+    parser.add_argument('--images', type=int, default=24)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    print("🚀 Benchmarking OCR engine")
+    print("="*60)
+
+    try:
+        print(f"🔧 tesseract {pytesseract.get_tesseract_version()}")
+    except Exception as e:
+        raise SystemExit(f"❌ tesseract is not available: {e}")
+
+    if args.corpus:
+        paths = sorted(glob.glob(os.path.join(args.corpus, '*')))[:args.images]
+        corpus = [open(path, 'rb').read() for path in paths]
+    else:
+        sizes = [(1280, 720), (1920, 1080), (1170, 2532), (2560, 1440), (5472, 3648)]
+        corpus = [_synthetic_screenshot(*sizes[i % len(sizes)], seed=i) for i in range(args.images)]
+    print(f"🖼️ {len(corpus)} images, {sum(map(len, corpus)) / 2**20:.1f} MB")
+
+    def naive(image_bytes):
+        return pytesseract.image_to_string(Image.open(io.BytesIO(image_bytes)))
+
+    engine = OCREngine()
+    engine.warm_up()
+    for label, fn in (("In-thread, full resolution", naive), ("Process-pool engine", engine.extract_text)):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(fn, corpus))
+        elapsed = time.perf_counter() - start
+        print(f"   {label:28} {elapsed:7.2f}s  {len(corpus) / elapsed:6.2f} images/s")
+
+    bomb = io.BytesIO()
+    Image.new('1', (10_000, 10_000)).save(bomb, format='PNG')
+    try:
+        engine.extract_text(bomb.getvalue())
+    except ImageTooLarge as e:
+        print(f"\n🛡️ {len(bomb.getvalue()) / 1024:.0f} KB bomb rejected: {e}")
+
+    print(f"\n📊 {engine.get_stats()}")
+    engine.shutdown()
+    print("\n🎉 Benchmark complete!")
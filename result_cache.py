@@ -0,0 +1,241 @@
+# result_cache.py - Content-addressed cache for text, URL and image analyses
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from url_canonical import canonical_url
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 24 * 3600
+TOUCH_BATCH_SIZE = 256    # disk hits whose last_access is written in one transaction
+
+
+def text_cache_key(text):
+    """Hash of the text with Unicode and whitespace differences normalized away"""
+    # Case is kept on purpose: the classifier is cased and ALL CAPS is a content signal
+    normalized = ' '.join(unicodedata.normalize('NFC', text).split())
+    return 'text:' + hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def url_cache_key(url):
+    # Tracking parameters, AMP and mobile variants of an article share one entry
+    return 'url:' + hashlib.sha256(canonical_url(url).encode('utf-8')).hexdigest()
+
+
+def image_cache_key(image_bytes):
+    return 'image:' + hashlib.sha256(image_bytes).hexdigest()
+
+
+class SQLiteCacheBackend:
+    """On-disk second tier so cached analyses survive restarts
+
+    Hits only record their access time in memory; the times are written in batches,
+    and before eviction reads them. The byte total is kept as a running count so a
+    write doesn't have to sum the table.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES * 4, touch_batch_size=TOUCH_BATCH_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.touch_batch_size = touch_batch_size
+        self._lock = threading.Lock()
+        self._touched = {}    # key -> last access not yet written
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_access ON analysis_cache(last_access)")
+        self._conn.commit()
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM analysis_cache").fetchone()[0]
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, size, expires_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, size, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self._bytes -= size
+                self._touched.pop(key, None)
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch_size:
+                self._flush_touched()
+                self._conn.commit()
+            return value, expires_at
+
+    def set(self, key, value, expires_at):
+        now = time.time()
+        size = len(value.encode('utf-8'))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM analysis_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, size, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, expires_at, now)
+            )
+            self._touched.pop(key, None)
+            self._bytes += size - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict(now)
+            self._conn.commit()
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany("UPDATE analysis_cache SET last_access = ? WHERE key = ?",
+                                   [(accessed, key) for key, accessed in self._touched.items()])
+            self._touched.clear()
+
+    def _evict(self, now):
+        self._flush_touched()
+        self._conn.execute("DELETE FROM analysis_cache WHERE expires_at <= ?", (now,))
+        # Re-sync the running total while we're paying for a scan anyway
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM analysis_cache").fetchone()[0]
+        if total > self.max_bytes:
+            # Drop least recently used rows until we are back under the byte budget
+            rows = self._conn.execute("SELECT key, size FROM analysis_cache ORDER BY last_access").fetchall()
+            doomed = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            self._conn.executemany("DELETE FROM analysis_cache WHERE key = ?", doomed)
+        self._bytes = total
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
+
+
+class ResultCache:
+    """In-memory LRU/TTL cache bounded by entries and bytes, with an optional disk tier"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, backend=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+
+        # key -> (serialized result, expires_at, size in bytes); values are stored as JSON
+        # so callers always get a private copy and the byte bound is exact
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'expirations': 0}
+
+    def get(self, key):
+        """Return a copy of the cached result or None"""
+        value = self._get_memory(key)
+        if value is None:
+            value = self._get_backend(key)
+        return json.loads(value) if value is not None else None
+
+    async def get_async(self, key):
+        """get for the event loop: memory hits inline, the disk tier in a worker thread"""
+        value = self._get_memory(key)
+        if value is None:
+            if self.backend is not None:
+                value = await asyncio.to_thread(self._get_backend, key)
+            else:
+                value = self._get_backend(key)
+        return json.loads(value) if value is not None else None
+
+    def _get_memory(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return value
+                self._remove(key)
+                self.stats['expirations'] += 1
+        return None
+
+    def _get_backend(self, key):
+        if self.backend is not None:
+            row = self.backend.get(key)
+            if row is not None:
+                value, expires_at = row
+                with self._lock:
+                    self.stats['hits'] += 1
+                    self.stats['disk_hits'] += 1
+                    self._insert(key, value, expires_at)
+                return value
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def set(self, key, result, ttl_seconds=None):
+        value = json.dumps(result, default=str)
+        expires_at = time.time() + (ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+        with self._lock:
+            self.stats['stores'] += 1
+            self._insert(key, value, expires_at)
+        if self.backend is not None:
+            self.backend.set(key, value, expires_at)
+
+    def _insert(self, key, value, expires_at):
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, expires_at, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats['evictions'] += 1
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['backend'] = 'sqlite' if self.backend is not None else 'memory'
+        return stats
+
+
+def build_result_cache():
+    """Memory-only by default; set ANALYSIS_CACHE_DB to a file path to persist across restarts"""
+    path = os.environ.get('ANALYSIS_CACHE_DB')
+    backend = SQLiteCacheBackend(path) if path else None
+    return ResultCache(backend=backend)
@@ -0,0 +1,71 @@
+# result_stream.py - NDJSON and Server-Sent Events encoding for streamed analysis results
+
+import asyncio
+import json
+
+from fastapi.responses import StreamingResponse
+
+STREAM_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+DEFAULT_STREAM_FORMAT = 'ndjson'
+
+# Sent on idle SSE streams so proxies don't close a connection waiting on a slow stage
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def stream_format(request):
+    """'sse' or 'ndjson', from ?format= first and the Accept header second"""
+    requested = request.query_params.get('format', '').strip().lower()
+    if requested in STREAM_FORMATS:
+        return requested
+    accept = request.headers.get('accept', '')
+    if STREAM_FORMATS['sse'] in accept:
+        return 'sse'
+    return DEFAULT_STREAM_FORMAT
+
+
+def encode_event(stream_format, event, payload):
+    """One event as an NDJSON line or an SSE frame"""
+    if stream_format == 'sse':
+        return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+    return json.dumps({'event': event, **payload}, default=str) + "\n"
+
+
+def streaming_response(events, stream_format):
+    """Wrap an async iterator of (event, payload) pairs in a StreamingResponse.
+
+    Every event is written as soon as it is produced; nothing is collected first,
+    so memory stays flat however long the stream runs.
+    """
+    async def body():
+        if stream_format != 'sse':
+            async for event, payload in events:
+                yield encode_event(stream_format, event, payload)
+            return
+
+        iterator = events.__aiter__()
+        next_event = asyncio.ensure_future(iterator.__anext__())
+        try:
+            while True:
+                # The pending __anext__ survives the timeout; only a comment frame is sent
+                done, _ = await asyncio.wait({next_event}, timeout=SSE_KEEPALIVE_SECONDS)
+                if not done:
+                    yield ": keepalive\n\n"
+                    continue
+                try:
+                    event, payload = next_event.result()
+                except StopAsyncIteration:
+                    return
+                yield encode_event(stream_format, event, payload)
+                next_event = asyncio.ensure_future(iterator.__anext__())
+        finally:
+            next_event.cancel()
+
+    return StreamingResponse(
+        body(),
+        media_type=STREAM_FORMATS[stream_format],
+        # Proxies (nginx) buffer responses by default, which would hold back every event
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
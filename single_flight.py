@@ -0,0 +1,87 @@
+# single_flight.py - Coalesce identical concurrent async calls into one execution
+
+import asyncio
+
+
+class SingleFlight:
+    """At most one call per key in flight; concurrent callers with the same key share its result.
+
+    Keys must identify the input completely (the result cache keys do). Exceptions
+    are shared like results. Callers are shielded from each other: one that is
+    cancelled or times out stops waiting without cancelling the shared call.
+    Not thread-safe; use one instance per event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}        # key -> future of the call in flight
+        self.stats = {'calls': 0, 'coalesced': 0}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def do(self, key, fn, *args):
+        """await fn(*args), unless a call with the same key is already running"""
+        call = self._calls.get(key)
+        if call is not None:
+            self.stats['coalesced'] += 1
+        else:
+            self.stats['calls'] += 1
+            call = self._calls[key] = asyncio.ensure_future(fn(*args))
+            call.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(call)
+
+    async def do_many(self, keys, fn):
+        """{key: result} for distinct keys, where fn(keys) computes the ones not already in flight.
+
+        fn receives only the keys it has to compute and returns {key: result} for them;
+        it runs once as a batch, and callers of do() or do_many() that arrive with one
+        of those keys meanwhile wait on that key alone. A key missing from fn's answer
+        fails with KeyError.
+        """
+        loop = asyncio.get_running_loop()
+        calls = {}
+        leading = []
+        for key in keys:
+            call = self._calls.get(key)
+            if call is not None:
+                self.stats['coalesced'] += 1
+            else:
+                self.stats['calls'] += 1
+                call = self._calls[key] = loop.create_future()
+                call.add_done_callback(lambda done, key=key: self._forget(key, done))
+                leading.append(key)
+            calls[key] = call
+
+        if leading:
+            batch = asyncio.ensure_future(fn(list(leading)))
+            batch.add_done_callback(lambda done: self._settle(leading, calls, done))
+
+        results = await asyncio.gather(*(asyncio.shield(call) for call in calls.values()), return_exceptions=True)
+        outcomes = dict(zip(calls, results))
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return outcomes
+
+    def _settle(self, keys, calls, batch):
+        for key in keys:
+            call = calls[key]
+            if call.done():
+                continue
+            if batch.cancelled():
+                call.cancel()
+            elif batch.exception() is not None:
+                call.set_exception(batch.exception())
+            elif key not in batch.result():
+                call.set_exception(KeyError(key))
+            else:
+                call.set_result(batch.result()[key])
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            call.exception()    # retrieved here in case every waiter has gone
+
+    def get_stats(self):
+        return dict(self.stats, in_flight=len(self._calls))
@@ -0,0 +1,260 @@
+# tokenization.py - Shared, cached tokenization for the classifier pipelines
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+MAX_SEQUENCE_TOKENS = 512
+ENCODING_CACHE_SIZE = 1024
+# Texts are cut to this many characters per allowed token before tokenizing, so a
+# 200 KB article isn't fully tokenized only to keep its first 512 tokens
+MAX_CHARS_PER_TOKEN = 16
+
+# Sliding windows for long documents: at most WINDOW_BUDGET windows per text,
+# neighbours sharing WINDOW_OVERLAP_TOKENS tokens so no sentence is only seen cut in half
+WINDOW_BUDGET = 8
+WINDOW_OVERLAP_TOKENS = 64
+MAX_WINDOWED_CHARS = 200_000      # about 50k tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _fingerprint(tokenizer):
+    """Identical for tokenizers that turn every text into the same ids"""
+    backend = getattr(tokenizer, 'backend_tokenizer', None)
+    if backend is None:
+        return None
+    # The serialized fast tokenizer covers normalizer, pre-tokenizer, vocab and special tokens
+    return hashlib.sha1(backend.to_str().encode('utf-8')).hexdigest()
+
+
+class TokenizationEngine:
+    """Tokenizes each text once per vocabulary and keeps the encodings in an LRU cache.
+
+    Encodings are keyed by (vocabulary fingerprint, text hash), so two models whose
+    fast tokenizers serialize identically share one encoding, and a text analysed
+    again (a repeated claim, OCR text re-checked as a claim) skips tokenization.
+    Truncation is by token count, not characters.
+    """
+
+    def __init__(self, max_length=MAX_SEQUENCE_TOKENS, cache_size=ENCODING_CACHE_SIZE):
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._models = {}   # name -> (tokenizer, vocabulary key, max_length)
+        self._lock = threading.Lock()
+        # A fast tokenizer mutates its truncation settings per call, so calls are serialized
+        self._tokenizer_locks = {}
+        self._stats = {}
+
+    def _model(self, name, tokenizer):
+        known = self._models.get(name)
+        if known is not None and known[0] is tokenizer:
+            return known
+        limit = getattr(tokenizer, 'model_max_length', self.max_length)
+        max_length = min(self.max_length, limit) if limit else self.max_length
+        # Tokenizers without a serializable backend get a private, per-model cache key
+        vocabulary = _fingerprint(tokenizer) or f"model:{name}"
+        known = self._models[name] = (tokenizer, vocabulary, max_length)
+        with self._lock:
+            self._tokenizer_locks.setdefault(name, threading.Lock())
+            self._stats.setdefault(name, {
+                'texts': 0, 'cache_hits': 0, 'shared_hits': 0, 'tokenized': 0,
+                'tokenize_seconds': 0.0, 'tokens': 0, 'longest': 0, 'at_max_length': 0,
+            })
+        shared = [other for other, (_, key, _) in self._models.items() if key == vocabulary and other != name]
+        if shared:
+            logger.info("Sharing tokenizer vocabulary; encodings are reused",
+                        extra={'model': name, 'shared_with': shared})
+        return known
+
+    def encode_batch(self, name, tokenizer, texts):
+        """Return [{'input_ids': [...], 'attention_mask': [...]}] for texts, tokenizing only misses"""
+        tokenizer, vocabulary, max_length = self._model(name, tokenizer)
+        char_limit = max_length * MAX_CHARS_PER_TOKEN
+        texts = [text[:char_limit] for text in texts]
+        keys = [(vocabulary, hashlib.sha1(text.encode('utf-8')).digest()) for text in texts]
+
+        encodings = [None] * len(texts)
+        missing = {}
+        shared_hits = 0
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    encodings[i] = cached[0]
+                    shared_hits += cached[1] != name
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if missing:
+            batch = [texts[positions[0]] for positions in missing.values()]
+            started = time.perf_counter()
+            with self._tokenizer_locks[name]:
+                encoded = tokenizer(batch, truncation=True, max_length=max_length)
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                stats = self._stats[name]
+                stats['tokenized'] += len(batch)
+                stats['tokenize_seconds'] += elapsed
+                for (key, positions), input_ids, attention_mask in zip(
+                        missing.items(), encoded['input_ids'], encoded['attention_mask']):
+                    encoding = {'input_ids': input_ids, 'attention_mask': attention_mask}
+                    for i in positions:
+                        encodings[i] = encoding
+                    stats['tokens'] += len(input_ids)
+                    stats['longest'] = max(stats['longest'], len(input_ids))
+                    stats['at_max_length'] += len(input_ids) >= max_length
+                    self._cache[key] = (encoding, name)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        with self._lock:
+            stats = self._stats[name]
+            stats['texts'] += len(texts)
+            stats['cache_hits'] += len(texts) - sum(len(p) for p in missing.values())
+            stats['shared_hits'] += shared_hits
+        return encodings
+
+    def encode_windows(self, name, tokenizer, text, max_windows=WINDOW_BUDGET,
+                       overlap=WINDOW_OVERLAP_TOKENS):
+        """Split a long text into overlapping max-length token windows.
+
+        Returns (encodings, total_windows, total_tokens). When the text needs more
+        windows than max_windows, evenly spaced ones are kept (always the first and
+        last), so the cost stays fixed while the whole document is still sampled.
+        """
+        tokenizer, vocabulary, max_length = self._model(name, tokenizer)
+        key = (vocabulary, hashlib.sha1(text.encode('utf-8')).digest(), 'windows', max_windows, overlap)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._stats[name]['texts'] += 1
+                self._stats[name]['cache_hits'] += 1
+                return cached[0]
+
+        started = time.perf_counter()
+        with self._tokenizer_locks[name]:
+            # The fast tokenizer cuts the overflow into max_length windows itself, each
+            # with its own special tokens and `overlap` tokens repeated from the previous one
+            encoded = tokenizer(text[:MAX_WINDOWED_CHARS], truncation=True, max_length=max_length,
+                                stride=overlap, return_overflowing_tokens=True)
+        windows = list(zip(encoded['input_ids'], encoded['attention_mask']))
+
+        total_windows = len(windows)
+        if total_windows > max_windows:
+            last = total_windows - 1
+            windows = [windows[round(i * last / (max_windows - 1))] for i in range(max_windows)] \
+                if max_windows > 1 else windows[:1]
+        encodings = [{'input_ids': input_ids, 'attention_mask': attention_mask}
+                     for input_ids, attention_mask in windows]
+        elapsed = time.perf_counter() - started
+
+        specials = tokenizer.num_special_tokens_to_add(pair=False)
+        token_count = sum(len(ids) - specials for ids in encoded['input_ids']) - overlap * (total_windows - 1)
+        result = (encodings, total_windows, token_count)
+        with self._lock:
+            stats = self._stats[name]
+            stats['texts'] += 1
+            stats['tokenized'] += 1
+            stats['tokenize_seconds'] += elapsed
+            stats['tokens'] += token_count
+            stats['longest'] = max(stats['longest'], token_count)
+            stats['windowed_texts'] = stats.get('windowed_texts', 0) + 1
+            stats['windows'] = stats.get('windows', 0) + len(encodings)
+            self._cache[key] = (result, name)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    def get_stats(self):
+        with self._lock:
+            report = {'cached_encodings': len(self._cache), 'models': {}}
+            for name, stats in self._stats.items():
+                stats = dict(stats)
+                tokenized = stats['tokenized']
+                stats['tokenize_ms_per_text'] = round(stats['tokenize_seconds'] * 1000 / tokenized, 3) if tokenized else 0
+                stats['mean_tokens'] = round(stats['tokens'] / tokenized, 1) if tokenized else 0
+                stats['tokenize_seconds'] = round(stats['tokenize_seconds'], 4)
+                report['models'][name] = stats
+            return report
+
+
+def classify_encodings(classifier, encodings):
+    """Run a text-classification pipeline's model on pre-tokenized inputs.
+
+    Returns the same [{'label', 'score'}] top-1 results the pipeline itself would.
+    """
+    import torch
+
+    batch = classifier.tokenizer.pad(
+        [{'input_ids': e['input_ids'], 'attention_mask': e['attention_mask']} for e in encodings],
+        return_tensors='pt'
+    )
+    with torch.inference_mode():
+        logits = classifier.model(**batch).logits.float()
+
+    config = classifier.model.config
+    # Same activation choice as the pipeline's default function_to_apply
+    if config.num_labels == 1 or getattr(config, 'problem_type', None) == 'multi_label_classification':
+        probabilities = logits.sigmoid()
+    else:
+        probabilities = logits.softmax(-1)
+    scores, label_ids = probabilities.max(-1)
+    return [{'label': config.id2label[int(label_id)], 'score': float(score)}
+            for score, label_id in zip(scores, label_ids)]
+
+
+# Compare the pipelines' own tokenization with the shared engine
+if __name__ == "__main__":
+    import argparse
+    from transformers import pipeline
+
+    parser = argparse.ArgumentParser(description="Benchmark shared tokenization against per-pipeline tokenization")
+    parser.add_argument('--fake-model', default="hamzab/roberta-fake-news-classification")
+    parser.add_argument('--sentiment-model', default="distilbert/distilbert-base-uncased-finetuned-sst-2-english")
+    parser.add_argument('--texts', type=int, default=64)
+    args = parser.parse_args()
+
+    print("🚀 Benchmarking shared tokenization")
+    print("="*60)
+
+    fake = pipeline("text-classification", model=args.fake_model)
+    sentiment = pipeline("sentiment-analysis", model=args.sentiment_model)
+
+    sentence = "Officials confirmed on Tuesday that the report, published by the ministry, was accurate. "
+    texts = [f"{i}: " + sentence * (1 + i % 12) for i in range(args.texts)]
+
+    start = time.perf_counter()
+    expected = fake(texts, batch_size=16, truncation=True)
+    sentiment(texts, batch_size=16, truncation=True)
+    pipeline_ms = (time.perf_counter() - start) * 1000
+
+    engine = TokenizationEngine()
+    print()
+    for label in ("cold", "warm"):
+        start = time.perf_counter()
+        for i in range(0, len(texts), 16):
+            chunk = texts[i:i + 16]
+            results = classify_encodings(fake, engine.encode_batch('fake_news', fake.tokenizer, chunk))
+            classify_encodings(sentiment, engine.encode_batch('sentiment', sentiment.tokenizer, chunk))
+        print(f"⏱️ Shared engine ({label} cache): {(time.perf_counter() - start) * 1000:8.1f} ms")
+    print(f"⏱️ Pipelines as before:         {pipeline_ms:8.1f} ms")
+
+    results = []
+    for i in range(0, len(texts), 16):
+        results += classify_encodings(fake, engine.encode_batch('fake_news', fake.tokenizer, texts[i:i + 16]))
+    drift = max(abs(a['score'] - b['score']) for a, b in zip(results, expected))
+    labels_match = all(a['label'] == b['label'] for a, b in zip(results, expected))
+    print(f"\n🎯 Parity with the pipeline: labels match={labels_match}, max score drift={drift:.2e}")
+
+    for name, stats in engine.get_stats()['models'].items():
+        print(f"   {name:10} tokenized {stats['tokenized']} of {stats['texts']} texts, "
+              f"{stats['tokenize_ms_per_text']} ms each, mean {stats['mean_tokens']} tokens, "
+              f"{stats['at_max_length']} at the {MAX_SEQUENCE_TOKENS}-token limit")
+    print("\n🎉 Benchmark complete!")
@@ -0,0 +1,277 @@
+# upload_stream.py - Streaming multipart image uploads with early size and type checks
+
+import struct
+
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import ClientDisconnect
+
+from ocr_engine import MAX_IMAGE_PIXELS
+
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MULTIPART_OVERHEAD_BYTES = 64 * 1024    # boundaries, part headers and small form fields
+SNIFF_BYTES = 64 * 1024                 # JPEG dimensions can sit behind EXIF data
+
+# Batch uploads: each image keeps MAX_UPLOAD_BYTES, the request as a whole gets these
+MAX_BATCH_IMAGES = 50
+MAX_BATCH_UPLOAD_BYTES = 100 * 1024 * 1024
+
+_UNSUPPORTED_TYPE = "Unsupported file type; upload a PNG, JPEG, GIF, WebP, BMP or TIFF image"
+
+_MAGIC = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+)
+
+
+class UploadRejected(Exception):
+    """The upload is too large (413), not an image (415) or not a valid form (400)"""
+
+    def __init__(self, status_code, detail):
+        self.status_code = status_code
+        self.detail = detail
+        super().__init__(detail)
+
+
+def sniff_image_format(header):
+    """Image format from the first bytes, or None if they match no supported format"""
+    for magic, image_format in _MAGIC:
+        if header.startswith(magic):
+            return image_format
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _jpeg_dimensions(data):
+    position = 2
+    while position + 9 <= len(data):
+        if data[position] != 0xFF:
+            position += 1
+            continue
+        marker = data[position + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7 or marker == 0xFF:
+            position += 1 if marker == 0xFF else 2
+            continue
+        segment_length = struct.unpack('>H', data[position + 2:position + 4])[0]
+        # Start-of-frame markers carry the dimensions (C4, C8 and CC are not frames)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[position + 5:position + 9])
+            return width, height
+        position += 2 + segment_length
+    return None
+
+
+def _webp_dimensions(data):
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30:
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(data) >= 30:
+        return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    return None
+
+
+def sniff_image_dimensions(image_format, header):
+    """(width, height) from the image header, or None if more bytes are needed / unknown"""
+    if image_format == 'png' and len(header) >= 24:
+        return struct.unpack('>II', header[16:24])
+    if image_format == 'gif' and len(header) >= 10:
+        return struct.unpack('<HH', header[6:10])
+    if image_format == 'bmp' and len(header) >= 26:
+        width, height = struct.unpack('<ii', header[18:26])
+        return abs(width), abs(height)
+    if image_format == 'jpeg':
+        return _jpeg_dimensions(header)
+    if image_format == 'webp':
+        return _webp_dimensions(header)
+    return None  # TIFF keeps its dimensions anywhere in the file; the OCR worker checks it
+
+
+class UploadedImage:
+    """One image part of a multipart upload; error is the UploadRejected it failed with"""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.data = bytearray()
+        self.image_format = None
+        self.dimensions = None
+        self.complete = False
+        self.error = None
+
+    @property
+    def image(self):
+        return bytes(self.data) if self.error is None else None
+
+
+class _ImagePartReader:
+    """MultipartParser callbacks that keep only the image field(s), validating as they arrive.
+
+    With max_parts=1 the first bad part rejects the whole upload. With more, a bad
+    part (wrong type, too large) is recorded on its UploadedImage, its bytes are
+    dropped, and the rest of the form is still read.
+    """
+
+    def __init__(self, field_name, max_bytes, max_pixels, max_parts=1):
+        self.field_name = field_name
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.max_parts = max_parts
+
+        self.parts = []
+        self._current = None         # the UploadedImage being received
+
+        self._headers = {}
+        self._header_field = b''
+        self._header_value = b''
+
+    @property
+    def complete(self):
+        """A single-image reader has its image; the rest of the form can be skipped"""
+        return self.max_parts == 1 and bool(self.parts) and self.parts[0].complete
+
+    def callbacks(self):
+        return {
+            'on_part_begin': self._on_part_begin,
+            'on_header_field': lambda data, start, end: self._append_header('_header_field', data[start:end]),
+            'on_header_value': lambda data, start, end: self._append_header('_header_value', data[start:end]),
+            'on_header_end': self._on_header_end,
+            'on_headers_finished': self._on_headers_finished,
+            'on_part_data': self._on_part_data,
+            'on_part_end': self._on_part_end,
+        }
+
+    def _append_header(self, attribute, data):
+        setattr(self, attribute, getattr(self, attribute) + data)
+
+    def _on_part_begin(self):
+        self._headers = {}
+        self._current = None
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b''
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+        name = options.get(b'name', b'').decode('utf-8', 'replace')
+        if name != self.field_name or self.complete:
+            return
+        if len(self.parts) >= self.max_parts:
+            raise UploadRejected(413, f"At most {self.max_parts} images can be uploaded at once")
+        self._current = UploadedImage(options.get(b'filename', b'').decode('utf-8', 'replace') or None)
+        self.parts.append(self._current)
+
+    def _reject(self, part, status_code, detail):
+        if self.max_parts == 1:
+            raise UploadRejected(status_code, detail)
+        part.error = UploadRejected(status_code, detail)
+        part.data = bytearray()
+
+    def _on_part_data(self, data, start, end):
+        part = self._current
+        if part is None or part.error is not None:
+            return
+        already_sniffed = len(part.data) >= SNIFF_BYTES
+        part.data.extend(data[start:end])
+        if len(part.data) > self.max_bytes:
+            return self._reject(part, 413, f"Image is larger than the {self.max_bytes // (1024 * 1024)} MB limit")
+
+        if part.image_format is None and len(part.data) >= 16:
+            part.image_format = sniff_image_format(bytes(part.data[:16]))
+            if part.image_format is None:
+                return self._reject(part, 415, _UNSUPPORTED_TYPE)
+
+        if part.image_format is not None and part.dimensions is None and not already_sniffed:
+            part.dimensions = sniff_image_dimensions(part.image_format, bytes(part.data[:SNIFF_BYTES]))
+            if part.dimensions is not None:
+                width, height = part.dimensions
+                if width * height > self.max_pixels:
+                    return self._reject(part, 413, f"Image is {width}x{height} ({width * height:,} pixels); "
+                                                   f"the limit is {self.max_pixels:,} pixels")
+
+    def _on_part_end(self):
+        part = self._current
+        if part is None:
+            return
+        self._current = None
+        part.complete = True
+        if part.error is None:
+            if not part.data:
+                self._reject(part, 400, "The uploaded file is empty")
+            elif part.image_format is None:
+                self._reject(part, 415, _UNSUPPORTED_TYPE)
+
+
+async def _stream_parts(request, reader, body_limit, limit_detail):
+    content_type, options = parse_options_header(request.headers.get('content-type', ''))
+    boundary = options.get(b'boundary')
+    if content_type != b'multipart/form-data' or not boundary:
+        raise UploadRejected(415, f"Expected a multipart/form-data upload with a '{reader.field_name}' field")
+
+    declared = request.headers.get('content-length')
+    if declared is not None and declared.isdigit() and int(declared) > body_limit:
+        raise UploadRejected(413, limit_detail)
+
+    parser = MultipartParser(boundary, reader.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                raise UploadRejected(413, limit_detail)
+            parser.write(chunk)
+            if reader.complete:
+                break  # the rest of the form is not needed
+        else:
+            parser.finalize()
+    except MultipartParseError as e:
+        # A malformed body is the client's error, not an unexpected one
+        raise UploadRejected(400, f"Malformed multipart upload: {e}")
+    except ClientDisconnect:
+        raise UploadRejected(400, "The client disconnected before the upload finished")
+
+
+async def read_image_upload(request, field_name='file', max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_IMAGE_PIXELS):
+    """Stream a multipart/form-data request and return the image field's bytes.
+
+    The body is never buffered whole: the Content-Length is checked before reading,
+    and the running byte count, file type (magic bytes) and pixel dimensions (image
+    header) are checked while chunks arrive, so a 200 MB upload or a renamed PDF is
+    refused after its first few kilobytes. Raises UploadRejected.
+    """
+    reader = _ImagePartReader(field_name, max_bytes, max_pixels)
+    await _stream_parts(request, reader, max_bytes + MULTIPART_OVERHEAD_BYTES,
+                        f"Upload is larger than the {max_bytes // (1024 * 1024)} MB limit")
+
+    if not reader.complete:
+        raise UploadRejected(400, f"No complete '{field_name}' file field in the upload")
+    return reader.parts[0].image
+
+
+async def read_image_uploads(request, field_name='files', max_images=MAX_BATCH_IMAGES, max_bytes=MAX_UPLOAD_BYTES,
+                             max_total_bytes=MAX_BATCH_UPLOAD_BYTES, max_pixels=MAX_IMAGE_PIXELS):
+    """Stream a multipart/form-data request with several image parts under field_name.
+
+    Returns an UploadedImage per part in upload order; parts that fail the type, size
+    or dimension checks carry their UploadRejected in .error instead of bytes. The
+    request as a whole is rejected (UploadRejected) only when it is not a form, has
+    more than max_images parts or more than max_total_bytes in total.
+    """
+    reader = _ImagePartReader(field_name, max_bytes, max_pixels, max_parts=max_images)
+    await _stream_parts(request, reader, max_total_bytes + MULTIPART_OVERHEAD_BYTES,
+                        f"Upload is larger than the {max_total_bytes // (1024 * 1024)} MB batch limit")
+
+    if not reader.parts:
+        raise UploadRejected(400, f"No '{field_name}' file fields in the upload")
+    if not reader.parts[-1].complete:
+        raise UploadRejected(400, "The upload ended in the middle of a file")
+    return reader.parts
@@ -0,0 +1,156 @@
+# url_canonical.py - One identity per article URL: trackers, AMP variants, mobile hosts and fragments removed
+
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, urljoin
+
+from domain_trie import normalize_domain, registrable_domain
+
+# Query parameters that only say how the reader arrived, never which article it is
+TRACKING_PARAMS = frozenset({
+    'fbclid', 'gclid', 'gclsrc', 'dclid', 'msclkid', 'yclid', 'twclid', 'ttclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'oly_anon_id', 'oly_enc_id', 'vero_id', 'wickedid',
+    'ref', 'ref_src', 'ref_url', 'cmpid', 'ocid', 'smid', 'smtyp', 'soc_src', 'soc_trk', 'ito',
+    'ns_mchannel', 'ns_source', 'ns_campaign', 'ns_linkname', 'ns_fee',
+    'guccounter', 'guce_referrer', 'guce_referrer_sig', 'at_medium', 'at_campaign',
+})
+TRACKING_PREFIXES = ('utm_', 'pk_', 'mtm_', 'hsa_', 'at_custom')
+
+# ?amp=1, ?outputType=amp and friends select the AMP rendering of the same article
+AMP_PARAMS = frozenset({'amp', 'outputtype', 'amp_js_v', 'usqp'})
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def unwrap_amp_cache(url):
+    """The publisher URL behind a Google AMP cache or AMP viewer URL, or url unchanged.
+
+    https://example-com.cdn.ampproject.org/c/s/example.com/a/b -> https://example.com/a/b
+    https://www.google.com/amp/s/example.com/a/b               -> https://example.com/a/b
+    """
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    path = parts.path
+    if host.endswith('.cdn.ampproject.org'):
+        # /c/ for documents, /v/ for viewer links; /i/ and /r/ are images and fonts
+        for prefix in ('/c/', '/v/'):
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+                break
+        else:
+            return url
+    elif host in ('www.google.com', 'google.com') and path.startswith('/amp/'):
+        path = path[len('/amp/'):]
+    else:
+        return url
+    scheme = 'http'
+    if path.startswith('s/'):
+        scheme, path = 'https', path[2:]
+    if not path or path.startswith('/'):
+        return url
+    return f"{scheme}://{path}" + (f"?{parts.query}" if parts.query else '')
+
+
+def strip_tracking(url):
+    """The URL to download: AMP caches unwrapped, tracking parameters and the fragment dropped.
+
+    Everything else (host, path, parameter order) is left alone so the publisher
+    serves the same page it would for the original URL.
+    """
+    parts = urlsplit(unwrap_amp_cache(url.strip()))
+    pairs = parse_qsl(parts.query, keep_blank_values=True)
+    kept = [(name, value) for name, value in pairs if not _is_tracking(name)]
+    query = parts.query if len(kept) == len(pairs) else urlencode(kept)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, query, ''))
+
+
+def _strip_amp_path(path):
+    # Only the publishers' AMP layouts: an 'amp' segment elsewhere (/news/amp/...) may be a real
+    # section, so it is dropped only when the page confirms it (see confirmed_canonical)
+    segments = path.split('/')
+    # /2024/story/amp, /2024/story/amp.html, with or without a trailing slash
+    last = len(segments) - 1 if segments[-1] else len(segments) - 2
+    if last > 1 and segments[last].lower() in ('amp', 'amp.html'):
+        del segments[last]
+    # /amp/2024/story
+    if len(segments) > 2 and segments[1].lower() == 'amp' and any(segments[2:]):
+        del segments[1]
+    path = '/'.join(segments)
+    # /2024/story.amp, /2024/story.amp.html
+    lower = path.lower()
+    for suffix in ('.amp.html', '.amp'):
+        if lower.endswith(suffix):
+            path = path[:-len(suffix)] + ('.html' if suffix == '.amp.html' else '')
+            break
+    return path
+
+
+def canonical_url(url):
+    """The identity of an article URL, used as the cache key and to coalesce fetches.
+
+    On top of strip_tracking: lower-case host without www./m./mobile./amp. labels,
+    http and https treated alike, default ports, AMP path and query variants and
+    trailing slashes removed, and the remaining query sorted.
+    """
+    parts = urlsplit(strip_tracking(url))
+    scheme = parts.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+    host = normalize_domain(parts.hostname or '')
+    if parts.port and parts.port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{parts.port}"
+    path = _strip_amp_path(parts.path).rstrip('/') or '/'
+    pairs = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+             if name.lower() not in AMP_PARAMS]
+    query = urlencode(sorted(pairs))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def _same_site(url, other):
+    hosts = [urlsplit(u).hostname or '' for u in (url, other)]
+    return registrable_domain(normalize_domain(hosts[0])) == registrable_domain(normalize_domain(hosts[1]))
+
+
+def resolve_canonical(url, declared=None):
+    """canonical_url of the page's own <link rel="canonical">, when it points at the same site.
+
+    url is where the page was finally fetched from (after redirects). A declaration
+    naming another site is ignored, so a page can't claim to be someone else's
+    article. The result is what the page says it is, for display; it is not
+    proof, so it never becomes a cache key by itself (see confirmed_canonical).
+    """
+    if declared:
+        target = urljoin(url, declared.strip())
+        target_parts = urlsplit(target)
+        if target_parts.scheme in ('http', 'https') and target_parts.hostname and _same_site(url, target):
+            return canonical_url(target)
+    return canonical_url(url)
+
+
+def _is_amp_rendering(url, target):
+    """Whether canonical url is canonical target with 'amp' path segments added"""
+    parts = urlsplit(url)
+    path = '/'.join(segment for segment in parts.path.split('/') if segment.lower() not in ('amp', 'amp.html'))
+    return path != parts.path and urlunsplit(parts._replace(path=path.rstrip('/') or '/')) == target
+
+
+def confirmed_canonical(url, final_url, declared=None):
+    """Another canonical URL the fetch of url itself vouches for, or None.
+
+    That is the final URL when same-site redirects led somewhere else, or the
+    declared rel=canonical when the fetched page is that article's AMP rendering.
+    A bare declaration is only the page's claim and must not answer in the cache
+    for a URL nobody fetched.
+    """
+    requested, final = canonical_url(url), canonical_url(final_url)
+    if final != requested:
+        # Cross-site redirects (shorteners) keep their own key: the source verdict is for url's site
+        return final if _same_site(url, final_url) else None
+    if declared:
+        target = resolve_canonical(final_url, declared)
+        if target != final and _is_amp_rendering(final, target):
+            return target
+    return None